@@ -91,6 +91,21 @@ contract Mental_Poker {
     
     function get_cards_owner() public view returns(uint8[DECK_SIZE] memory) { return cards_owner; }
 
+    /* everything a client shows about the table, so that it can be refreshed with a single call
+     * the outputs are assigned one by one, returning them as a tuple would need too many stack slots */
+    function get_game_state() public view returns(Status _status, uint8 _turn_index, uint256[MAX_PLAYERS] memory _bets,
+                                                  bool[MAX_PLAYERS] memory _fold_flags, uint256 _pot, uint8 _reporter_index,
+                                                  uint8[MAX_PLAYERS] memory _number_of_changed_cards, uint8 _last_raise_index) {
+        _status = status;
+        _turn_index = turn_index;
+        _bets = get_bets();
+        _fold_flags = fold_flags;
+        _pot = pot;
+        _reporter_index = reporter_index;
+        _number_of_changed_cards = number_of_changed_cards;
+        _last_raise_index = last_raise_index;
+    }
+
 
     constructor() {
         status = Status.matchmaking;
@@ -32,3 +32,44 @@ class Card:
 
     def __str__(self):
         return f"{self.rank.name} OF {self.suit.name}"
+
+# the 52 cards, created once and shared by every hand
+# a card id is its index here, the order in which the deck coding is assigned
+DECK = tuple(Card(suit, rank) for rank in Rank for suit in Suit)
+
+class CardCodec:
+    # maps deck codings back to cards
+    # the contract stores the deck coding as uint8[52], so a code always fits a 256-entry table
+
+    CODE_LIMIT = 256
+
+    def __init__(self, deck_coding):
+        if len(deck_coding) > len(DECK):
+            raise ValueError("Deck coding longer than the deck")
+        self.card_ids = [None] * self.CODE_LIMIT
+        for card_id, code in enumerate(deck_coding):
+            if not 0 <= code < self.CODE_LIMIT:
+                raise ValueError("Invalid card code")
+            self.card_ids[code] = card_id
+
+    def card_id(self, code):
+        # returns None if code is not part of the deck coding
+        if 0 <= code < self.CODE_LIMIT:
+            return self.card_ids[code]
+        return None
+
+    def decode(self, code):
+        card_id = self.card_id(code)
+        return None if card_id is None else DECK[card_id]
+
+    def decode_hand(self, codes):
+        # returns the list of cards, or None if any code is not part of the deck coding
+        card_ids = self.card_ids
+        limit = self.CODE_LIMIT
+        hand = []
+        for code in codes:
+            card_id = card_ids[code] if 0 <= code < limit else None
+            if card_id is None:
+                return None
+            hand.append(DECK[card_id])
+        return hand
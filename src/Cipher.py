@@ -0,0 +1,237 @@
+from QR import quadratic_residues, validate_coding
+from SRA import *
+from SRA import _hkdf_sha256
+from abc import ABC, abstractmethod
+import secrets
+
+class CommutativeCipher(ABC):
+    # interface of the ciphers the client can play with: encryptions commute,
+    # so every player can add and remove its own layer in any order
+    # cards and encrypted cards are always represented as ints
+
+    @abstractmethod
+    def key(self, e: int, d: int):
+        # returns the key object for (e, d), exposing e, d, encrypt(_many) and decrypt(_many)
+        pass
+
+    @abstractmethod
+    def generate_key(self):
+        pass
+
+    @abstractmethod
+    def derive_key(self, master_secret: bytes, contract_address: str, hand_counter: int):
+        # deterministic version of generate_key
+        pass
+
+    @abstractmethod
+    def generate_deck_coding(self, deck_size: int):
+        pass
+
+    @abstractmethod
+    def validate_deck_coding(self, deck_coding):
+        # returns the index of the first invalid code, None otherwise
+        pass
+
+    @abstractmethod
+    def encrypt_deck(self, cards, e: int):
+        pass
+
+    @abstractmethod
+    def decrypt_deck(self, cards, d: int):
+        pass
+
+    def encrypt(self, card: int, e: int):
+        return self.encrypt_deck([card], e)[0]
+
+    def decrypt(self, card: int, d: int):
+        return self.decrypt_deck([card], d)[0]
+
+    def verify_step(self, inputs, outputs, e: int):
+        # checks that outputs[i] is inputs[i] encrypted with e
+        return self.encrypt_deck(inputs, e) == list(outputs)
+
+class SRACipher(CommutativeCipher):
+    # SRA over a prime modulus n, the cipher the contract is able to verify
+
+    def __init__(self, n: int):
+        self.n = n
+
+    @classmethod
+    def setup(cls, bits: int):
+        return cls(sra_setup(bits))
+
+    def key(self, e: int, d: int):
+        return SRAKey(self.n, e, d)
+
+    def generate_key(self):
+        return self.key(*sra_generate_key(self.n - 1))
+
+    def derive_key(self, master_secret: bytes, contract_address: str, hand_counter: int):
+        return self.key(*sra_derive_key(master_secret, contract_address, hand_counter, self.n - 1))
+
+    def generate_deck_coding(self, deck_size: int):
+        # choosing only quadratic residues to map the cards to represent the deck
+        return quadratic_residues(self.n, deck_size)
+
+    def validate_deck_coding(self, deck_coding):
+        return validate_coding(self.n, deck_coding)
+
+    def encrypt_deck(self, cards, e: int):
+        return encrypt_deck(cards, e, self.n)
+
+    def decrypt_deck(self, cards, d: int):
+        return decrypt_deck(cards, d, self.n)
+
+    def verify_step(self, inputs, outputs, e: int):
+        return batch_verify(inputs, outputs, e, self.n)
+
+class ECCipher(CommutativeCipher):
+    # Massey-Omura style cipher on secp256k1: a card is a curve point P, encrypting it with e gives e*P
+    # and decrypting multiplies by d = e^-1 mod the (prime) group order
+    # points are represented as ints: x + (y mod 2) * 2^256
+
+    P = 0xFFFFFFFFFFFFFFFFFFFFFFFFFFFFFFFFFFFFFFFFFFFFFFFFFFFFFFFEFFFFFC2F
+    ORDER = 0xFFFFFFFFFFFFFFFFFFFFFFFFFFFFFFFEBAAEDCE6AF48A03BBFD25E8CD0364141
+    B = 7
+    # each card code is followed by 8 bits of padding, used to find an x on the curve
+    PADDING_BITS = 8
+
+    def key(self, e: int, d: int):
+        return ECKey(self, e, d)
+
+    def generate_key(self):
+        e = 2 + secrets.randbelow(self.ORDER - 3)
+        return self.key(e, pow(e, -1, self.ORDER))
+
+    def derive_key(self, master_secret: bytes, contract_address: str, hand_counter: int):
+        salt = contract_address.lower().encode()
+        attempt = 0
+        while True:
+            info = b'EC key' + hand_counter.to_bytes(32, 'big') + attempt.to_bytes(4, 'big')
+            e = int.from_bytes(_hkdf_sha256(master_secret, salt, info, 32), 'big')
+            if 2 <= e < self.ORDER:
+                return self.key(e, pow(e, -1, self.ORDER))
+            attempt += 1
+
+    def encode_card(self, code: int):
+        # try-and-increment: the first padding giving an x on the curve is kept
+        for padding in range(1 << self.PADDING_BITS):
+            x = (code << self.PADDING_BITS) | padding
+            y = self._y_from_x(x)
+            if y is not None:
+                return self._compress(x, y)
+        raise ValueError('Card code cannot be mapped onto the curve.')
+
+    def decode_card(self, point: int):
+        x, _ = self._decompress(point)
+        return x >> self.PADDING_BITS
+
+    def generate_deck_coding(self, deck_size: int):
+        return [self.encode_card(code) for code in range(2, 2 + deck_size)]
+
+    def validate_deck_coding(self, deck_coding):
+        for index, point in enumerate(deck_coding):
+            try:
+                self._decompress(point)
+            except ValueError:
+                return index
+        return None
+
+    def encrypt_deck(self, cards, e: int):
+        return [self._multiply(card, e) for card in cards]
+
+    def decrypt_deck(self, cards, d: int):
+        return [self._multiply(card, d) for card in cards]
+
+    def _y_from_x(self, x: int):
+        if x >= self.P:
+            return None
+        rhs = (x * x * x + self.B) % self.P
+        # P = 3 mod 4, so the square root is a single exponentiation
+        y = pow(rhs, (self.P + 1) // 4, self.P)
+        if y * y % self.P != rhs:
+            return None
+        return y
+
+    def _compress(self, x: int, y: int):
+        return x | ((y & 1) << 256)
+
+    def _decompress(self, point: int):
+        x = point & ((1 << 256) - 1)
+        y = self._y_from_x(x)
+        if y is None or point >> 257 != 0:
+            raise ValueError('Not a point on the curve.')
+        if y & 1 != point >> 256:
+            y = self.P - y
+        return (x, y)
+
+    def _multiply(self, point: int, scalar: int):
+        # double and add in Jacobian coordinates, infinity is represented with Z = 0
+        p = self.P
+        x, y = self._decompress(point)
+        rx, ry, rz = 0, 1, 0
+        for bit in reversed(range(scalar.bit_length())):
+            if rz != 0:
+                rx, ry, rz = self._double(rx, ry, rz)
+            if scalar >> bit & 1:
+                if rz == 0:
+                    rx, ry, rz = x, y, 1
+                else:
+                    rx, ry, rz = self._add_affine(rx, ry, rz, x, y)
+        if rz == 0:
+            raise ValueError('Scalar is a multiple of the group order.')
+        z_inverse = pow(rz, -1, p)
+        z_inverse_squared = z_inverse * z_inverse % p
+        return self._compress(rx * z_inverse_squared % p, ry * z_inverse_squared * z_inverse % p)
+
+    def _double(self, x: int, y: int, z: int):
+        p = self.P
+        if y == 0:
+            return (0, 1, 0)
+        y_squared = y * y % p
+        s = 4 * x * y_squared % p
+        m = 3 * x * x % p
+        new_x = (m * m - 2 * s) % p
+        new_y = (m * (s - new_x) - 8 * y_squared * y_squared) % p
+        new_z = 2 * y * z % p
+        return (new_x, new_y, new_z)
+
+    def _add_affine(self, x1: int, y1: int, z1: int, x2: int, y2: int):
+        # adds the affine point (x2, y2) to the Jacobian point (x1, y1, z1)
+        p = self.P
+        z1_squared = z1 * z1 % p
+        u2 = x2 * z1_squared % p
+        s2 = y2 * z1_squared * z1 % p
+        h = (u2 - x1) % p
+        r = (s2 - y1) % p
+        if h == 0:
+            if r == 0:
+                return self._double(x1, y1, z1)
+            return (0, 1, 0)
+        h_squared = h * h % p
+        h_cubed = h_squared * h % p
+        x1_h_squared = x1 * h_squared % p
+        new_x = (r * r - h_cubed - 2 * x1_h_squared) % p
+        new_y = (r * (x1_h_squared - new_x) - y1 * h_cubed) % p
+        new_z = z1 * h % p
+        return (new_x, new_y, new_z)
+
+class ECKey:
+    # ECCipher counterpart of SRA.SRAKey
+
+    def __init__(self, cipher: ECCipher, e: int, d: int):
+        self.cipher = cipher
+        self.e = e
+        self.d = d
+
+    def encrypt(self, card: int):
+        return self.cipher.encrypt(card, self.e)
+
+    def decrypt(self, card: int):
+        return self.cipher.decrypt(card, self.d)
+
+    def encrypt_many(self, cards):
+        return self.cipher.encrypt_deck(cards, self.e)
+
+    def decrypt_many(self, cards):
+        return self.cipher.decrypt_deck(cards, self.d)
@@ -1,11 +1,25 @@
 from Contract_communication_handler import *
 from Poker import *
+from Prime_pool import *
+from Cipher import *
+from Deck_buffer import *
+from Deck_prefetcher import *
 from SRA import *
 from UI import *
 import random
+import secrets
+import os
 
 N_BITS = 256
+DECK_SIZE = 52
+PRIME_POOL_FILE_PATH = './primes.json'
+MASTER_SECRET_FILE_PATH = './master_secret.key'
+PARTICIPATION_FILE_PATH = './participation.tx'
 DEBUG = False
+# start decrypting the next cards in background as soon as the dispatcher sees their block
+SPECULATIVE_DEAL = True
+# check the own shuffle step before publishing it, for SRA it is a batched check costing a few modexps
+VERIFY_OWN_STEP = True
 
 def get_wallet_info():
     wallet_address = ''
@@ -39,6 +53,29 @@ def get_wallet_info():
         except Exception as e:
             print(str(e))
 
+def load_master_secret(file_path):
+    # SRA keys are derived from this secret, so it is created once and kept private
+    try:
+        with open(file_path, 'rb') as file:
+            return file.read()
+    except FileNotFoundError:
+        master_secret = secrets.token_bytes(32)
+        with open(os.open(file_path, os.O_WRONLY | os.O_CREAT | os.O_EXCL, 0o600), 'wb') as file:
+            file.write(master_secret)
+        return master_secret
+
+def save_participation(file_path, transaction_hash):
+    # the participation identifies the hand the keys are derived for, so it is kept next to the master secret
+    participation = Web3.to_hex(transaction_hash)
+    with open(file_path, 'w') as file:
+        file.write(participation)
+    return participation
+
+def load_participation(file_path):
+    # after a restart, get_hand_counter(load_participation(...)) gives back the counter the keys were derived with
+    with open(file_path) as file:
+        return file.read().strip()
+
 def calculate_next_turn(turn_index, fold_flags, max_players):
     new_turn_index = (turn_index + 1) % max_players
 
@@ -48,23 +85,8 @@ def calculate_next_turn(turn_index, fold_flags, max_players):
     else:
         return new_turn_index
 
-def generate_deck_encryption(n):
-    # choosing only quadratic residues to map the cards to represent the deck
-    deck_coding = []
-    deck_size = 52
-    count = 0
-    for i in range(2, n):
-        if count >= deck_size:
-            break
-        if is_quadratic_residue(i, n) == 1:
-            deck_coding.append(i)
-            count += 1
-    return deck_coding
-
 def calculate_hands(max_players):
-    deck = cch.get_deck()
-    cards_owner = cch.get_cards_owner()
-    hand_size = cch.get_hand_size
+    deck, cards_owner, hand_size = cch.read_state('deck', 'cards_owner', 'HAND_SIZE')
     hands = [[] for _ in range(max_players)]
         
     hands_filled = 0
@@ -83,60 +105,74 @@ def shuffle_dealer(assigned_index):
     if DEBUG: print('Listening for shuffle events')
     cch.catch_shuffle_event(assigned_index, max_players)
 
-    n = sra_setup(N_BITS)
-    if DEBUG: print('n =', n)
+    cipher = SRACipher.setup(N_BITS)
+    if DEBUG: print('n =', cipher.n)
 
-    deck_coding = generate_deck_encryption(n)
-    deck_map = {key: value for key, value in zip(deck_coding, [Card(suit, rank) for rank in Rank for suit in Suit])}
+    deck_coding = cipher.generate_deck_coding(DECK_SIZE)
+    codec = CardCodec(deck_coding)
     if DEBUG: print('deck coding =\n', deck_coding)
 
-    e, d = sra_generate_key(n-1)
+    # keys are derived so that they can be recomputed if the client restarts
+    key = cipher.derive_key(master_secret, cch.contract_address, hand_counter)
 
-    enc = [sra_encrypt(card, e, n) for card in deck_coding]
+    enc = key.encrypt_many(DeckBuffer.from_ints(deck_coding))
 
-    random.shuffle(enc)
+    # a wrong step would cost the deposit once check_shuffle replays it, so it is checked before being published
+    if VERIFY_OWN_STEP and not cipher.verify_step(deck_coding, enc, key.e):
+        exit('Deck encryption failed the consistency check.')
+
+    # the permutation has to be unpredictable, so it is drawn from the OS CSPRNG
+    enc.shuffle()
 
     if DEBUG: print('encrypted_deck =\n', enc)
 
-    cch.shuffle_dealer(n, deck_coding, enc)
+    cch.shuffle_dealer(cipher.n, deck_coding, enc)
 
     # waiting for the shuffle phase to end
     cch.catch_shuffle_event(max_players, max_players)
 
-    return n, e, d, deck_map
+    return cipher, key, codec
 
 def shuffle(assigned_index):
     if DEBUG: print('Listening for shuffle events')
     turn_index = cch.catch_shuffle_event(assigned_index, max_players)
     
     if turn_index >= max_players:
-        return (None, None, None, None)
+        return (None, None, None)
 
     n = cch.get_n()
     # checking if n length is appropriate
     if n < 2**(N_BITS-2):
         cch.report_n()
-        return (None, None, None, None)
+        return (None, None, None)
     
     if DEBUG: print('n =', n)
 
+    cipher = SRACipher(n)
+
     deck_coding = cch.get_deck_coding()
     # checking if deck_coding is valid
-    for index, code in enumerate(deck_coding):
-        if is_quadratic_residue(code, n) != 1:
-            cch.report_deck_coding(index)
-            return (None, None, None, None)
+    invalid_index = cipher.validate_deck_coding(deck_coding)
+    if invalid_index is not None:
+        cch.report_deck_coding(invalid_index)
+        return (None, None, None)
     
-    deck_map = {key: value for key, value in zip(deck_coding, [Card(suit, rank) for rank in Rank for suit in Suit])}
+    codec = CardCodec(deck_coding)
     if DEBUG: print('deck coding =\n', deck_coding)
 
     deck = cch.get_deck()
 
-    e, d = sra_generate_key(n-1)
+    # keys are derived so that they can be recomputed if the client restarts
+    key = cipher.derive_key(master_secret, cch.contract_address, hand_counter)
 
-    enc = [sra_encrypt(card, e, n) for card in deck]
+    enc = key.encrypt_many(deck)
 
-    random.shuffle(enc)
+    # a wrong step would cost the deposit once check_shuffle replays it, so it is checked before being published
+    if VERIFY_OWN_STEP and not cipher.verify_step(deck, enc, key.e):
+        exit('Deck encryption failed the consistency check.')
+
+    # the permutation has to be unpredictable, so it is drawn from the OS CSPRNG
+    enc.shuffle()
 
     if DEBUG: print('encrypted_deck =\n', enc)
 
@@ -145,41 +181,58 @@ def shuffle(assigned_index):
     # waiting for the shuffle phase to end
     cch.catch_shuffle_event(max_players, max_players)
 
-    return n, e, d, deck_map
+    return cipher, key, codec
 
-def deal_cards(assigned_index, max_players, n, d, deck_map):
+def deal_cards(assigned_index, max_players, key, codec):
     player_hand = []
 
-    for _ in range(max_players):
-        if DEBUG: print('Listening for draw events')
-        draw_index, topdeck_index, hand_size = cch.catch_draw_event(assigned_index)
-
-        # the contract communicates the phase is over when num_cards = 0
-        if hand_size == 0:
-            break
-
-        deck = cch.get_deck()
+    # the first hand is drawn from the top of the deck, then every draw moves the top by a hand
+    hand_size = cch.get_hand_size()
+    prefetcher = DeckPrefetcher(cch, key) if SPECULATIVE_DEAL else None
+    if prefetcher is not None: prefetcher.expect(0, hand_size)
+
+    try:
+        for _ in range(max_players):
+            if DEBUG: print('Listening for draw events')
+            draw_index, topdeck_index, hand_size = cch.catch_draw_event(assigned_index)
+
+            # the contract communicates the phase is over when num_cards = 0
+            if hand_size == 0:
+                break
+
+            # a speculation is discarded if it was not computed on the deck this event refers to
+            speculation = None
+            if prefetcher is not None:
+                speculation = prefetcher.take(cch.last_event_block, topdeck_index, hand_size)
+                prefetcher.expect(topdeck_index + hand_size, hand_size)
+
+            if speculation is not None:
+                encrypted_hand, hand = speculation
+            else:
+                deck = cch.get_deck()
 
-        encrypted_hand = deck[topdeck_index : (topdeck_index + hand_size)]
+                encrypted_hand = deck[topdeck_index : (topdeck_index + hand_size)]
 
-        hand = [sra_decrypt(card, d, n) for card in encrypted_hand]
+                hand = key.decrypt_many(encrypted_hand)
 
-        # if client has to draw
-        if draw_index == assigned_index:
-            # reading and checking if cards drawn are valid
-            player_hand = []
-            for card_coding in hand:
-                if card_coding in deck_map:
-                    player_hand.append(deck_map[card_coding])
-                else:
+            # if client has to draw
+            if draw_index == assigned_index:
+                # reading and checking if cards drawn are valid
+                player_hand = codec.decode_hand(hand)
+                if player_hand is None:
                     cch.report_draw()
-                    return player_hand
+                    return []
             
-            cch.draw()
+                cch.draw()
 
-        # if someone else has to draw
-        else:
-            cch.reveal_cards(hand)
+            # if someone else has to draw
+            else:
+                cch.reveal_cards(hand)
+    finally:
+        # the thread has to stop on every way out of the phase, early returns included
+        if prefetcher is not None:
+            prefetcher.stop()
+            if DEBUG: print('Speculative decryptions used:', prefetcher.hits, 'discarded:', prefetcher.misses)
         
     return player_hand
 
@@ -191,22 +244,22 @@ def stake_round(assigned_index, max_players, phase):
         if DEBUG: print('Listening for stake events')
         turn_index = cch.catch_stake_event(turn_index, max_players)
 
-        last_raise_index = cch.get_last_raise_index()
-        bets = cch.get_bets()
-        fold_flags = cch.get_fold_flags()
+        # the whole table is refreshed with a single call
+        game = cch.get_game_state()
+        last_raise_index, bets, fold_flags = game.last_raise_index, game.bets, game.fold_flags
         
         clear_screen()
         print('Your hand:')
         print_hand(player_hand)
         print_bets(assigned_index, max_players, last_raise_index, bets, fold_flags, phase)
         if phase == 2:
-            print_number_of_changed_cards(max_players, cch.get_number_of_changed_cards())
-            print_pot(cch.get_pot())
+            print_number_of_changed_cards(max_players, game.number_of_changed_cards)
+            print_pot(game.pot)
 
         # when stake phase is over 'turn_index = max_players'
         if turn_index >= max_players:
             if phase == 1:
-                print_pot(cch.get_pot())
+                print_pot(game.pot)
             break
         
         # if it's this client's turn
@@ -254,7 +307,7 @@ def card_change(max_players):
         
         turn_index = calculate_next_turn(turn_index, fold_flags, max_players)
 
-def deal_replacement_cards(assigned_index, max_players, n, d, deck_map):
+def deal_replacement_cards(assigned_index, max_players, key, codec):
     new_hand = player_hand
     
     for _ in range(max_players):
@@ -273,66 +326,56 @@ def deal_replacement_cards(assigned_index, max_players, n, d, deck_map):
             cards_owner = cch.get_cards_owner()
 
             # recreating player's hand and checking if cards are valid
-            new_hand = []
-            for card_index, owner in enumerate(cards_owner):
-                if owner == assigned_index:
-                    card_coding = sra_decrypt(deck[card_index], d, n)
-                    if card_coding in deck_map:
-                        new_hand.append(deck_map[card_coding])
-                    else:
-                        cch.report_draw()
-                        return new_hand
-                    
-                    if len(new_hand) == hand_size:
-                        break
+            encrypted_hand = [deck[card_index] for card_index, owner in enumerate(cards_owner) if owner == assigned_index][:hand_size]
+            new_hand = codec.decode_hand(key.decrypt_many(encrypted_hand))
+            if new_hand is None:
+                cch.report_draw()
+                return []
             
             cch.draw()
         
         # if someone else has to draw
         else:
             encrypted_cards = deck[topdeck_index : (topdeck_index + num_cards)]
-            cards = [sra_decrypt(card, d, n) for card in encrypted_cards]
+            cards = key.decrypt_many(encrypted_cards)
             
             cch.reveal_cards(cards)
         
     return new_hand
 
-def key_reveal(e, d):
+def key_reveal(key):
     if DEBUG: print('Listening for key reveal events')
     cch.catch_key_reveal_event()
-    cch.key_reveal(e, d)
+    cch.key_reveal(key.e, key.d)
 
     if DEBUG: print(cch.get_enc_keys())
     if DEBUG: print(cch.get_dec_keys())
 
-def verify(assigned_index, max_players, deck_map):
+def verify(assigned_index, max_players, cipher, codec):
     if DEBUG: print('Listening for verify events')
     cch.catch_optimistic_verify_event()
 
-    hand_size = cch.get_hand_size()
-    enc_keys = cch.get_enc_keys()
-    dec_keys = cch.get_dec_keys()
-    fold_flags = cch.get_fold_flags()
+    hand_size, enc_keys, dec_keys, fold_flags = cch.read_state('HAND_SIZE', 'enc_keys', 'dec_keys', 'fold_flags')
     hands = calculate_hands(max_players)
 
+    players_keys = [cipher.key(enc_keys[i], dec_keys[i]) for i in range(max_players)]
+
     # testing each player's key to check if they are legitimate
     for i in range(max_players):
         if i != assigned_index:
             random_num = random.randrange(N_BITS)
-            if sra_decrypt(sra_encrypt(random_num, enc_keys[i], n), dec_keys[i], n) != random_num:
+            if players_keys[i].decrypt(players_keys[i].encrypt(random_num)) != random_num:
                 if cch.get_reporter_index() == max_players:
                     cch.report_keys(i, random_num)
                 return (None, None)
 
     for i in range(max_players):
-        for j in range(hand_size):
-            decrypted_card = sra_decrypt(hands[i][j], dec_keys[i], n)
-            if decrypted_card in deck_map:
-                hands[i][j] = deck_map[decrypted_card]
-            else:
-                if cch.get_reporter_index() == max_players:
-                    cch.report_keys(i, 1)
-                return (None, None)  
+        decrypted_hand = codec.decode_hand(players_keys[i].decrypt_many(hands[i][:hand_size]))
+        if decrypted_hand is None:
+            if cch.get_reporter_index() == max_players:
+                cch.report_keys(i, 1)
+            return (None, None)
+        hands[i][:hand_size] = decrypted_hand
         
         if i == assigned_index:
             print('\nYour hand:')
@@ -364,36 +407,46 @@ def award(assigned_index, winner=None, winner_hand=None):
 if __name__ == '__main__':
 
     wallet_address, wallet_password = get_wallet_info()
+    master_secret = load_master_secret(MASTER_SECRET_FILE_PATH)
 
     cch = Contract_communication_handler(addresses_file_path='./addresses.txt', 
                                      abi_file_path='./abi.json',
                                      user_wallet_address=wallet_address,
                                      user_wallet_password=wallet_password)
     
-    max_players = cch.get_max_players()
-    deposit = cch.get_deposit()
+    # primes are generated in background (and kept on disk) in case the client is the dealer
+    set_prime_pool(PrimePool([N_BITS], file_path=PRIME_POOL_FILE_PATH))
+
+    # large moduli make deck encryption worth spreading over several processes
+    if N_BITS >= PARALLEL_MIN_BITS:
+        enable_parallel_decks()
+
+    # the hand size is only needed later, but it comes with no extra request
+    max_players, deposit, _ = cch.read_state('MAX_PLAYERS', 'DEPOSIT', 'HAND_SIZE')
     if DEBUG: print('Deposit:', deposit, '\nMax Players:', max_players)
 
     cch.participate(deposit)
+    # the counter is read through the saved participation, the same way a restarted client reads it
+    hand_counter = cch.get_hand_counter(save_participation(PARTICIPATION_FILE_PATH, cch.last_transaction))
     assigned_index = cch.get_my_turn_index()
     if DEBUG: print('Assigned index:', assigned_index)
     print('Waiting for other players...')
 
     # if client is dealer he has to choose n and generate deck coding
     if assigned_index == 0:
-        n, e, d, deck_map = shuffle_dealer(assigned_index)
+        cipher, key, codec = shuffle_dealer(assigned_index)
     # if client is not dealer (he reads n and deck coding)
     else:
-        n, e, d, deck_map = shuffle(assigned_index)
+        cipher, key, codec = shuffle(assigned_index)
 
     if cch.get_reporter_index() != max_players:
         award(assigned_index)
         exit()
     
-    player_hand = deal_cards(assigned_index, max_players, n, d, deck_map)
+    player_hand = deal_cards(assigned_index, max_players, key, codec)
 
     if cch.get_reporter_index() != max_players:
-        key_reveal(e, d)
+        key_reveal(key)
         award(assigned_index)
         exit()
 
@@ -401,24 +454,26 @@ if __name__ == '__main__':
     
     card_change(max_players)
     
-    player_hand = deal_replacement_cards(assigned_index, max_players, n, d, deck_map)
+    player_hand = deal_replacement_cards(assigned_index, max_players, key, codec)
 
     if cch.get_reporter_index() != max_players:
-        key_reveal(e, d)
+        key_reveal(key)
         award(assigned_index)
         exit()
     
     stake_round(assigned_index, max_players, 2)
 
-    key_reveal(e, d)
+    key_reveal(key)
     
     if cch.get_reporter_index() != max_players:
         award(assigned_index)
         exit()
 
-    (winner_index, winner_hand) = verify(assigned_index, max_players, deck_map)
+    (winner_index, winner_hand) = verify(assigned_index, max_players, cipher, codec)
 
     if cch.get_reporter_index() != max_players:
         award(assigned_index)
     else:
-        award(assigned_index, winner_index, winner_hand)
\ No newline at end of file
+        award(assigned_index, winner_index, winner_hand)
+
+    if DEBUG: print('Read cache:', cch.cache.stats())
\ No newline at end of file
@@ -1,8 +1,49 @@
 from web3 import Web3, HTTPProvider
+from dataclasses import dataclass
+from Deck_buffer import *
+from Event_dispatcher import *
+from Log_subscription import *
+from Read_cache import *
 import json
-import time
 
 DEBUG = False
+# longest wait between two reads of the contract's logs, when the node does not push them
+POLL_INTERVAL = 1
+
+@dataclass(frozen=True)
+class GameSnapshot:
+	# the table as returned by the contract's get_game_state, arrays are kept as tuples
+	status: int
+	turn_index: int
+	bets: tuple
+	fold_flags: tuple
+	pot: int
+	reporter_index: int
+	number_of_changed_cards: tuple
+	last_raise_index: int
+
+	@classmethod
+	def from_outputs(cls, outputs):
+		return cls(*(tuple(value) if isinstance(value, (list, tuple)) else value for value in outputs))
+
+# views that read_state can fetch: name -> (contract function, None for state views
+# or, for values that never change once set, the test telling whether they are set)
+VIEWS = {'MAX_PLAYERS': ('MAX_PLAYERS', lambda value: True),
+         'HAND_SIZE': ('HAND_SIZE', lambda value: True),
+         'DEPOSIT': ('DEPOSIT', lambda value: True),
+         'n': ('n', lambda n: n != 0),
+         'deck_coding': ('get_deck_coding', any),
+         'deck': ('get_deck', None),
+         'cards_owner': ('get_cards_owner', None),
+         'enc_keys': ('get_enc_keys', None),
+         'dec_keys': ('get_dec_keys', None),
+         'last_raise_index': ('get_last_raise_index', None),
+         'bets': ('get_bets', None),
+         'fold_flags': ('get_fold_flags', None),
+         'pot': ('pot', None),
+         'number_of_changed_cards': ('get_number_of_changed_cards', None),
+         'reporter_index': ('reporter_index', None),
+         'game_state': ('get_game_state', None)}
 
 class Contract_communication_handler:
 
@@ -57,190 +98,162 @@ class Contract_communication_handler:
 		except:
 			exit('Error during the creation of the "Contract" object.')
 
-	def catch_shuffle_event(self, turn_index, end_index):
+		# block of the last event returned by a catch_* function
+		self.last_event_block = None
+		# receipt of the last transaction, once it has been waited for
+		self.receipt = None
+
+		# view functions results, state views are dropped as soon as the dispatcher sees something new
+		self.cache = ReadCache()
+
+		# every event of the contract is read once, through a single cursor, and queued by type
+		# the node pushes the logs over a websocket when it can, otherwise the cursor is advanced every POLL_INTERVAL seconds
+		try:
+			self.dispatcher = EventDispatcher(self.connection, self.contract, self.connection.eth.block_number, POLL_INTERVAL)
+		except:
+			exit('Error during the creation of the event dispatcher.')
+		self.dispatcher.add_listener(self.cache.invalidate)
+		self.subscription = LogSubscription(websocket_url(self.node_address), self.contract_address, on_log=self.dispatcher.add_log)
+
+	@property
+	def last_transaction(self):
+		return self._last_transaction
+
+	@last_transaction.setter
+	def last_transaction(self, transaction):
+		# a transaction of this client changes the state as well
+		self._last_transaction = transaction
+		self.cache.invalidate()
+
+	def cached_state(self, name, read):
+		# without pushed logs a change made by another client would go unnoticed, so state views are always read
+		if not self.subscription.connected:
+			self.cache.invalidate()
+		return self.cache.state_view(name, read)
+
+	def last_receipt(self):
+		# the receipt of the last transaction is waited for only once,
+		# and the events it emitted are handed to the dispatcher straight away
+		if self.receipt is None or bytes(self.receipt['transactionHash']) != bytes(self.last_transaction):
+			self.receipt = self.connection.eth.wait_for_transaction_receipt(self.last_transaction)
+			self.dispatcher.add_receipt(self.receipt)
+		return self.receipt
+
+	def catch_event(self, name, accept):
+		# returns the first event of type 'name' for which accept(event) is true
+		# the last one emitted since this client's last transaction is checked first, since that transaction may have triggered it
+		block_number = self.last_receipt()['blockNumber']
+
+		# the queue position is taken together with the last event, so nothing queued in between can be skipped
+		event, position = self.dispatcher.snapshot(name, block_number)
+		if event is not None:
+			if DEBUG: print('Past event caught (from block', block_number, ').', dict(event['args']))
+			if accept(event):
+				return event
+
+		# otherwise wait for it
+		while True:
+			event = self.dispatcher.wait(name, position)
+			position += 1
 
-		# check if my last transaction triggered the event
-		transaction = self.connection.eth.get_transaction(self.last_transaction)
-		block_number = transaction['blockNumber']
-		logs = self.contract.events.shuffle_event.get_logs(fromBlock=block_number)
-		if len(logs) >= 1:
-			_turn_index = logs[-1]['args']['turn_index']
+			# an event older than the transaction can be queued late, but it is not new
+			if event['blockNumber'] < block_number:
+				continue
 
-			if DEBUG: print('Past event caught (from block', block_number, '). {turn_index:', _turn_index, '}')
-			if _turn_index == turn_index or _turn_index == end_index:
-				return _turn_index
-		
-		# otherwise listen for it
-		event_filter = self.contract.events.shuffle_event.create_filter(fromBlock='latest')
+			if DEBUG: print('New event caught.', dict(event['args']))
+			if accept(event):
+				return event
 
-		while True:
-			for event in event_filter.get_new_entries():
-				_turn_index = event['args']['turn_index']
-
-				if DEBUG: print('New event caught. {turn_index:', _turn_index, '}')
-				if _turn_index == turn_index or _turn_index == end_index:
-					return _turn_index
-				
-			time.sleep(1)
+	def catch_shuffle_event(self, turn_index, end_index):
+		event = self.catch_event('shuffle_event', lambda event: event['args']['turn_index'] in (turn_index, end_index))
+		return event['args']['turn_index']
 	
 	def catch_draw_event(self, turn_index):
-
-		# check if my last transaction triggered the event
-		transaction = self.connection.eth.get_transaction(self.last_transaction)
-		block_number = transaction['blockNumber']
-		logs = self.contract.events.draw_event.get_logs(fromBlock=block_number)
-		if len(logs) >= 1:
-			_turn_index = logs[-1]['args']['turn_index']
-			draw_index = logs[-1]['args']['draw_index']
-			topdeck_index = logs[-1]['args']['topdeck_index']
-			num_cards = logs[-1]['args']['num_cards']
-
-			if DEBUG: print('Past event caught (from block', block_number, ').',
-		          	        ' {turn_index:', _turn_index,
-		 		            ', draw_index:', draw_index,
-				            ', topdeck_index:', topdeck_index,
-				            ', num_cards:', num_cards, '}')
-			if _turn_index == turn_index or num_cards == 0:
-				return draw_index, topdeck_index, num_cards
-		
-		# otherwise listen for it
-		event_filter = self.contract.events.draw_event.create_filter(fromBlock='latest')
-
-		while True:
-			for event in event_filter.get_new_entries():
-				_turn_index = event['args']['turn_index']
-				draw_index = event['args']['draw_index']
-				topdeck_index = event['args']['topdeck_index']
-				num_cards = event['args']['num_cards']
-
-				if DEBUG: print('New event caught.',
-		                        ' {turn_index:', _turn_index,
-					            ', draw_index:', draw_index,
-					            ', topdeck_index:', topdeck_index,
-					            ', num_cards:', num_cards, '}')
-				if _turn_index == turn_index or num_cards == 0:
-					return draw_index, topdeck_index, num_cards
-				
-			time.sleep(1)
+		event = self.catch_event('draw_event', lambda event: event['args']['turn_index'] == turn_index or event['args']['num_cards'] == 0)
+		self.last_event_block = event['blockNumber']
+		return event['args']['draw_index'], event['args']['topdeck_index'], event['args']['num_cards']
 
 	def catch_stake_event(self, turn_index, end_index):
-
-		# check if my last transaction triggered the event
-		transaction = self.connection.eth.get_transaction(self.last_transaction)
-		block_number = transaction['blockNumber']
-		logs = self.contract.events.stake_event.get_logs(fromBlock=block_number)
-		if len(logs) >= 1:
-			_turn_index = logs[-1]['args']['turn_index']
-
-			if DEBUG: print('Past event caught (from block', block_number, ').',
-		                    ' {turn_index:', _turn_index, '}')
-			if _turn_index == turn_index or _turn_index == end_index:
-				return _turn_index
-		
-		# otherwise listen for it
-		event_filter = self.contract.events.stake_event.create_filter(fromBlock='latest')
-
-		while True:
-			for event in event_filter.get_new_entries():
-				_turn_index = event['args']['turn_index']
-
-				if DEBUG: print('New event caught.',
-					            ' {turn_index:', _turn_index, '}')
-				if _turn_index == turn_index or _turn_index == end_index:
-					return _turn_index
-				
-			time.sleep(1)
+		event = self.catch_event('stake_event', lambda event: event['args']['turn_index'] in (turn_index, end_index))
+		return event['args']['turn_index']
 	
 	def catch_card_change_event(self, turn_index, end_index):
-
-		# check if my last transaction triggered the event
-		transaction = self.connection.eth.get_transaction(self.last_transaction)
-		block_number = transaction['blockNumber']
-		logs = self.contract.events.card_change_event.get_logs(fromBlock=block_number)
-		if len(logs) >= 1:
-			_turn_index = logs[-1]['args']['turn_index']
-
-			if DEBUG: print('Past event caught (from block', block_number, '). {turn_index:', _turn_index, '}')
-			if _turn_index == turn_index or _turn_index == end_index:
-				return _turn_index
-		
-		# otherwise listen for it
-		event_filter = self.contract.events.card_change_event.create_filter(fromBlock='latest')
-
-		while True:
-			for event in event_filter.get_new_entries():
-				_turn_index = event['args']['turn_index']
-
-				if DEBUG: print('New event caught. {turn_index:', _turn_index, '}')
-				if _turn_index == turn_index or _turn_index == end_index:
-					return _turn_index
-				
-			time.sleep(1)
+		event = self.catch_event('card_change_event', lambda event: event['args']['turn_index'] in (turn_index, end_index))
+		return event['args']['turn_index']
 
 	def catch_key_reveal_event(self):
-
-		# check if my last transaction triggered the event
-		transaction = self.connection.eth.get_transaction(self.last_transaction)
-		block_number = transaction['blockNumber']
-		logs = self.contract.events.key_reveal_event.get_logs(fromBlock=block_number)
-		if len(logs) >= 1:
-			if DEBUG: print('Past event caught (from block', block_number, '). ')
-			return
-		
-		# otherwise listen for it
-		event_filter = self.contract.events.key_reveal_event.create_filter(fromBlock='latest')
-
-		while True:
-			for _ in event_filter.get_new_entries():
-				if DEBUG: print('New event caught.')
-				return
-				
-			time.sleep(1)
+		self.catch_event('key_reveal_event', lambda event: True)
 
 	def catch_optimistic_verify_event(self):
-
-		# check if my last transaction triggered the event
-		transaction = self.connection.eth.get_transaction(self.last_transaction)
-		block_number = transaction['blockNumber']
-		logs = self.contract.events.optimistic_verify_event.get_logs(fromBlock=block_number)
-		if len(logs) >= 1:
-			_result = logs[-1]['args']['result']
-
-			if DEBUG: print('Past event caught (from block', block_number, ').',
-		                    ' {result:', _result, '}')
-			return _result
-		
-		# otherwise listen for it
-		event_filter = self.contract.events.optimistic_verify_event.create_filter(fromBlock='latest')
-
-		while True:
-			for event in event_filter.get_new_entries():
-				_result = event['args']['result']
-
-				if DEBUG: print('New event caught. {result:', _result, '}')
-				return _result
-				
-			time.sleep(1)
+		event = self.catch_event('optimistic_verify_event', lambda event: True)
+		return event['args']['result']
 	
 	def catch_award_event(self):
+		self.catch_event('award_event', lambda event: True)
+
+	def batch_call(self, names):
+		# reads several views (without arguments) with a single JSON-RPC batch request through the web3 provider
+		# returns their values, in the same order
+		with self.connection.batch_requests() as batch:
+			for name in names:
+				function = VIEWS[name][0]
+				if function == 'get_deck':
+					# the deck is kept ABI encoded, skipping web3's decoding of its 52 integers
+					batch.add(self.connection.eth.call({'to': self.contract_address, 'data': self.contract.encode_abi(function)}))
+				else:
+					batch.add(getattr(self.contract.functions, function)())
+			outputs = batch.execute()
+		return [self.decode_view(name, output) for name, output in zip(names, outputs)]
+
+	def decode_view(self, name, output):
+		function = VIEWS[name][0]
+		if function == 'get_deck':
+			return DeckBuffer(bytes(output))
+		if function == 'get_game_state':
+			return GameSnapshot.from_outputs(output)
+		return list(output) if isinstance(output, (list, tuple)) else output
+
+	def read_view(self, name):
+		return self.batch_call([name])[0]
+
+	def read_state(self, *names):
+		# reads several views at once: cached values are reused, the others are fetched with a single batch request
+		# returns the values in the same order as 'names'
+		try:
+			if not self.subscription.connected:
+				self.cache.invalidate()
+			# taken before the batch is sent, so that state views fetched before an invalidation are recognized
+			generation = self.cache.generation()
+			missing = [name for name in names if not self.cache.cached(name)]
+			fetched = {}
+			if len(missing) > 0:
+				fetched = dict(zip(missing, self.batch_call(missing)))
+
+			values = []
+			for name in names:
+				is_set = VIEWS[name][1]
+				if is_set is None:
+					# a state view fetched before an invalidation is dropped and read again on its own
+					read = lambda name=name: fetched[name] if name in fetched and self.cache.is_current(generation) else self.read_view(name)
+					values.append(self.cache.state_view(name, read))
+				else:
+					read = lambda name=name: fetched[name] if name in fetched else self.read_view(name)
+					values.append(self.cache.constant(name, read, is_set))
+			return values
+		except:
+			exit('Error while reading the contract state.')
 
-		# check if my last transaction triggered the event
-		transaction = self.connection.eth.get_transaction(self.last_transaction)
-		block_number = transaction['blockNumber']
-		logs = self.contract.events.award_event.get_logs(fromBlock=block_number)
-		if len(logs) >= 1:
-			if DEBUG: print('Past event caught (from block', block_number, '). ')
-			return
-		
-		# otherwise listen for it
-		event_filter = self.contract.events.award_event.create_filter(fromBlock='latest')
+	def call_raw(self, function_signature, block_identifier='latest'):
+		# returns the ABI encoded output of a view function as it is, skipping web3's decoding
+		selector = Web3.keccak(text=function_signature)[:4]
+		return self.connection.eth.call({'to': self.contract_address, 'data': Web3.to_hex(selector)}, block_identifier)
 
-		while True:
-			for _ in event_filter.get_new_entries():
-				if DEBUG: print('New event caught.')
-				return
-				
-			time.sleep(1)
+	def transact_raw(self, function_signature, encoded_arguments):
+		# sends a transaction whose arguments are already ABI encoded
+		selector = Web3.keccak(text=function_signature)[:4]
+		return self.connection.eth.send_transaction({'from': self.wallet_address,
+		                                             'to': self.contract_address,
+		                                             'data': Web3.to_hex(selector + encoded_arguments)})
 
 	def participate(self, deposit):
 		try:
@@ -248,6 +261,16 @@ class Contract_communication_handler:
 		except:
 			exit('Error while calling function "participate".')
 	
+	def get_hand_counter(self, participation=None):
+		# the block that included the participation identifies the hand
+		# the hash of the participation is all a restarted client needs to read that block back from the chain
+		try:
+			if participation is None:
+				return self.last_receipt()['blockNumber']
+			return self.connection.eth.get_transaction_receipt(participation)['blockNumber']
+		except:
+			exit('Error while reading the participation receipt.')
+
 	def get_my_turn_index(self):
 		try:
 			return self.contract.functions.get_my_turn_index().call({'from': self.wallet_address})
@@ -256,73 +279,88 @@ class Contract_communication_handler:
 	
 	def shuffle_dealer(self, n, deck_coding, encrypted_deck):
 		try:
-			self.last_transaction = self.contract.functions.shuffle_dealer(n, deck_coding, encrypted_deck).transact({'from': self.wallet_address})
+			if isinstance(encrypted_deck, DeckBuffer):
+				encoded_arguments = n.to_bytes(CARD_BYTES, 'big') + DeckBuffer.from_ints(deck_coding).abi_encode() + encrypted_deck.abi_encode()
+				self.last_transaction = self.transact_raw(f'shuffle_dealer(uint256,uint8[{len(deck_coding)}],uint256[{len(encrypted_deck)}])', encoded_arguments)
+			else:
+				self.last_transaction = self.contract.functions.shuffle_dealer(n, deck_coding, encrypted_deck).transact({'from': self.wallet_address})
 		except:
 			exit('Error while calling function "shuffle_dealer".')
 	
 	def get_max_players(self):
 		try:
-			return self.contract.functions.MAX_PLAYERS().call()
+			return self.cache.constant('MAX_PLAYERS', self.contract.functions.MAX_PLAYERS().call)
 		except:
 			exit('Error while accessing attribute "MAX_PLAYERS".')
 	
 	def get_hand_size(self):
 		try:
-			return self.contract.functions.HAND_SIZE().call()
+			return self.cache.constant('HAND_SIZE', self.contract.functions.HAND_SIZE().call)
 		except:
 			exit('Error while accessing attribute "HAND_SIZE".')
 	
 	def get_deposit(self):
 		try:
-			return self.contract.functions.DEPOSIT().call()
+			return self.cache.constant('DEPOSIT', self.contract.functions.DEPOSIT().call)
 		except:
 			exit('Error while accessing attribute "DEPOSIT".')
 	
 	def get_n(self):
 		try:
-			return self.contract.functions.n().call()
+			# n is cached once the dealer has chosen it
+			return self.cache.constant('n', self.contract.functions.n().call, lambda n: n != 0)
 		except:
 			exit('Error while accessing attribute "n".')
 	
 	def get_enc_keys(self):
 		try:
-			return self.contract.functions.get_enc_keys().call()
+			return self.cached_state('enc_keys', self.contract.functions.get_enc_keys().call)
 		except:
 			exit('Error while calling function "get_enc_keys".')
 	
 	def get_dec_keys(self):
 		try:
-			return self.contract.functions.get_dec_keys().call()
+			return self.cached_state('dec_keys', self.contract.functions.get_dec_keys().call)
 		except:
 			exit('Error while calling function "get_dec_keys".')
 	
 	def get_deck_coding(self):
 		try:
-			return self.contract.functions.get_deck_coding().call()
+			return self.cache.constant('deck_coding', self.contract.functions.get_deck_coding().call, any)
 		except:
 			exit('Error while calling function "get_deck_coding".')
-	
-	def get_deck(self):
+
+	def get_deck(self, block_identifier='latest'):
 		try:
-			return self.contract.functions.get_deck().call()
+			if block_identifier != 'latest':
+				return DeckBuffer(self.call_raw('get_deck()', block_identifier))
+			return self.cached_state('deck', lambda: DeckBuffer(self.call_raw('get_deck()')))
 		except:
 			exit('Error while calling function "get_deck".')
 	
 	def get_cards_owner(self):
 		try:
-			return self.contract.functions.get_cards_owner().call()
+			return self.cached_state('cards_owner', self.contract.functions.get_cards_owner().call)
 		except:
 			exit('Error while calling function "get_cards_owner".')
 	
 	def shuffle(self, encrypted_deck):
 		try:
-			self.last_transaction = self.contract.functions.shuffle(encrypted_deck).transact({'from': self.wallet_address})
+			if isinstance(encrypted_deck, DeckBuffer):
+				self.last_transaction = self.transact_raw(f'shuffle(uint256[{len(encrypted_deck)}])', encrypted_deck.abi_encode())
+			else:
+				self.last_transaction = self.contract.functions.shuffle(encrypted_deck).transact({'from': self.wallet_address})
 		except:
 			exit('Error while calling function "shuffle".')
 	
 	def reveal_cards(self, encrypted_cards):
 		try:
-			self.last_transaction = self.contract.functions.reveal_cards(encrypted_cards).transact({'from': self.wallet_address})
+			if isinstance(encrypted_cards, DeckBuffer):
+				# a single dynamic argument: its offset followed by its content
+				encoded_arguments = CARD_BYTES.to_bytes(CARD_BYTES, 'big') + encrypted_cards.abi_encode_dynamic()
+				self.last_transaction = self.transact_raw('reveal_cards(uint256[])', encoded_arguments)
+			else:
+				self.last_transaction = self.contract.functions.reveal_cards(encrypted_cards).transact({'from': self.wallet_address})
 		except:
 			exit('Error while calling function "reveal_cards".')
 	
@@ -358,79 +396,99 @@ class Contract_communication_handler:
 	
 	def get_last_raise_index(self):
 		try:
-			return self.contract.functions.get_last_raise_index().call()
+			return self.cached_state('last_raise_index', self.contract.functions.get_last_raise_index().call)
 		except:
 			exit('Error while calling function "get_last_raise_index".')
 	
 	def get_bets(self):
 		try:
-			return self.contract.functions.get_bets().call()
+			return self.cached_state('bets', self.contract.functions.get_bets().call)
 		except:
 			exit('Error while calling function "get_bets".')
 	
 	def get_fold_flags(self):
 		try:
-			return self.contract.functions.get_fold_flags().call()
+			return self.cached_state('fold_flags', self.contract.functions.get_fold_flags().call)
 		except:
 			exit('Error while calling function "get_fold_flags".')
 	
 	def get_pot(self):
 		try:
-			return self.contract.functions.pot().call()
+			return self.cached_state('pot', self.contract.functions.pot().call)
 		except:
 			exit('Error while accessing attribute "pot".')
 	
 	def card_change(self, cards_to_change):
 		try:
-			return self.contract.functions.card_change(cards_to_change).transact({'from': self.wallet_address})
+			transaction = self.contract.functions.card_change(cards_to_change).transact({'from': self.wallet_address})
+			self.cache.invalidate()
+			return transaction
 		except:
 			exit('Error while calling function "card_change".')
 	
 	def get_number_of_changed_cards(self):
 		try:
-			return self.contract.functions.get_number_of_changed_cards().call()
+			return self.cached_state('number_of_changed_cards', self.contract.functions.get_number_of_changed_cards().call)
 		except:
 			exit('Error while calling function "get_number_of_changed_cards".')
 	
 	def key_reveal(self, e, d):
 		try:
-			return self.contract.functions.key_reveal(e, d).transact({'from': self.wallet_address})
+			transaction = self.contract.functions.key_reveal(e, d).transact({'from': self.wallet_address})
+			self.cache.invalidate()
+			return transaction
 		except:
 			exit('Error while calling function "key_reveal".')
 
 	def optimistic_verify(self, winner_index):
 		try:
-			return self.contract.functions.optimistic_verify(winner_index).transact({'from': self.wallet_address})
+			transaction = self.contract.functions.optimistic_verify(winner_index).transact({'from': self.wallet_address})
+			self.cache.invalidate()
+			return transaction
 		except:
 			exit('Error while calling function "optimistic_verify".')
 	
+	def get_game_state(self):
+		try:
+			return self.cached_state('game_state', lambda: GameSnapshot.from_outputs(self.contract.functions.get_game_state().call()))
+		except:
+			exit('Error while calling function "get_game_state".')
+
 	def get_reporter_index(self):
 		try:
-			return self.contract.functions.reporter_index().call()
+			return self.cached_state('reporter_index', self.contract.functions.reporter_index().call)
 		except:
 			exit('Error while accessing attribute "reporter_index".')
 
 	def report_n(self):
 		try:
-			return self.contract.functions.report_n().transact({'from': self.wallet_address})
+			transaction = self.contract.functions.report_n().transact({'from': self.wallet_address})
+			self.cache.invalidate()
+			return transaction
 		except:
 			exit('Error while calling function "report_n".')
 
 	def report_deck_coding(self, index):
 		try:
-			return self.contract.functions.report_deck_coding(index).transact({'from': self.wallet_address})
+			transaction = self.contract.functions.report_deck_coding(index).transact({'from': self.wallet_address})
+			self.cache.invalidate()
+			return transaction
 		except:
 			exit('Error while calling function "report_deck_coding".')
 
 	def report_draw(self):
 		try:
-			return self.contract.functions.report_draw().transact({'from': self.wallet_address})
+			transaction = self.contract.functions.report_draw().transact({'from': self.wallet_address})
+			self.cache.invalidate()
+			return transaction
 		except:
 			exit('Error while calling function "report_draw".')
 	
 	def report_keys(self, i, random_num):
 		try:
-			return self.contract.functions.report_keys(i, random_num).transact({'from': self.wallet_address})
+			transaction = self.contract.functions.report_keys(i, random_num).transact({'from': self.wallet_address})
+			self.cache.invalidate()
+			return transaction
 		except:
 			exit('Error while calling function "report_keys".')
 
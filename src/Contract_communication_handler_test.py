@@ -0,0 +1,152 @@
+from Contract_communication_handler import *
+from eth_abi import encode
+from http.server import BaseHTTPRequestHandler, HTTPServer
+from web3.datastructures import AttributeDict
+import threading
+
+with open('../abi.json') as file:
+    abi = json.load(file)
+
+# values the stand-in node answers with, by view function
+state = {'MAX_PLAYERS': [3], 'DEPOSIT': [10**18], 'HAND_SIZE': [5], 'get_bets': [[0, 5, 10]],
+         'get_fold_flags': [[False, True, False]], 'pot': [30], 'get_deck': [list(range(100, 152))],
+         'get_game_state': [3, 2, [0, 5, 10], [False, True, False], 30, 3, [0, 2, 1], 1]}
+selectors = {}
+for entry in abi:
+    if entry.get('type') == 'function' and entry['name'] in state:
+        selectors['0x' + Web3.keccak(text=entry['name'] + '()')[:4].hex()] = ([output['type'] for output in entry['outputs']], state[entry['name']])
+
+# a stand-in node answering JSON-RPC batches of eth_call
+requests_received = []
+# receipts by transaction hash
+receipts = {}
+# functions run once the answer to the next request is ready, as events arriving during the round trip
+during_request = []
+class Stand_in_node(BaseHTTPRequestHandler):
+    def do_POST(self):
+        batch = json.loads(self.rfile.read(int(self.headers['Content-Length'])))
+        if isinstance(batch, dict):
+            # single requests are only used for receipts
+            self.answer({'jsonrpc': '2.0', 'id': batch['id'], 'result': receipts.get(batch['params'][0])})
+            return
+        requests_received.append(batch)
+        results = []
+        for request in batch:
+            types, values = selectors[request['params'][0]['data'][:10]]
+            results.append({'jsonrpc': '2.0', 'id': request['id'], 'result': '0x' + encode(types, values).hex()})
+        while len(during_request) > 0:
+            during_request.pop()()
+        self.answer(list(reversed(results)))
+
+    def answer(self, response):
+        body = json.dumps(response).encode()
+        self.send_response(200)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+server = HTTPServer(('127.0.0.1', 0), Stand_in_node)
+threading.Thread(target=server.serve_forever, daemon=True).start()
+
+# only the parts of the handler read_state needs
+cch = Contract_communication_handler.__new__(Contract_communication_handler)
+cch.node_address = f'http://127.0.0.1:{server.server_port}'
+cch.contract_address = Web3.to_checksum_address('0x' + '11' * 20)
+cch.connection = Web3(HTTPProvider(cch.node_address))
+cch.contract = cch.connection.eth.contract(address=cch.contract_address, abi=abi)
+cch.cache = ReadCache()
+cch.subscription = AttributeDict({'connected': True})
+
+# several views have to come back decoded from a single batch request
+max_players, bets, fold_flags, pot, deck = cch.read_state('MAX_PLAYERS', 'bets', 'fold_flags', 'pot', 'deck')
+print('batch read:', len(requests_received) == 1 and len(requests_received[0]) == 5)
+print('batch decoding:', max_players == 3 and bets == [0, 5, 10] and fold_flags == [False, True, False] and pot == 30 and deck[51] == 151)
+
+# cached views are not requested again, a new event drops only the state views
+cch.read_state('MAX_PLAYERS', 'bets')
+cch.cache.invalidate()
+cch.read_state('MAX_PLAYERS', 'DEPOSIT', 'bets')
+print('cached reads:', len(requests_received) == 2 and len(requests_received[1]) == 2)
+
+# the get_game_state entry of the ABI has to match the outputs declared in the contract source
+import re
+with open('../contracts/Mental_Poker.sol') as file:
+    source = file.read()
+constants = dict(re.findall(r'constant (\w+) = (\d+);', source))
+declared = re.search(r'function get_game_state\(\) public view returns\((.*?)\) \{', source, re.S).group(1)
+declared_outputs = []
+for output in declared.split(','):
+    solidity_type, *_, name = output.split()
+    # enums are encoded as uint8, array sizes are constants of the contract
+    solidity_type = re.sub(r'\[(\w+)\]', lambda size: '[' + constants.get(size.group(1), size.group(1)) + ']', solidity_type.replace('Status', 'uint8'))
+    declared_outputs.append((solidity_type, name))
+game_state = next(entry for entry in abi if entry.get('name') == 'get_game_state')
+print('game state abi:', [(output['type'], output['name']) for output in game_state['outputs']] == declared_outputs)
+
+# and decode into a frozen GameSnapshot, with one eth_call
+game = cch.read_state('game_state')[0]
+print('game state decoding:', len(requests_received[-1]) == 1 and
+      game == GameSnapshot(3, 2, (0, 5, 10), (False, True, False), 30, 3, (0, 2, 1), 1))
+try:
+    game.pot = 0
+    print('game snapshot frozen: False')
+except AttributeError:
+    print('game snapshot frozen: True')
+
+# a value fetched before an invalidation has to be read again instead of being cached
+def new_bet():
+    cch.cache.invalidate()
+    state['get_bets'][0] = [1, 5, 10]
+cch.cache.invalidate()
+during_request.append(new_bet)
+bets = cch.read_state('bets')[0]
+print('stale batch dropped:', bets == [1, 5, 10] and cch.read_state('bets')[0] == [1, 5, 10])
+
+# a restarted client has to get the hand counter back from the participation it saved
+from Client import save_participation, load_participation
+import tempfile
+participation = '0x' + '44' * 32
+receipts[participation] = {'transactionHash': participation, 'transactionIndex': '0x0', 'blockHash': '0x' + '55' * 32,
+                           'blockNumber': '0x2a', 'from': cch.contract_address, 'to': cch.contract_address,
+                           'cumulativeGasUsed': '0x0', 'gasUsed': '0x0', 'contractAddress': None, 'logs': [],
+                           'logsBloom': '0x' + '00' * 256, 'status': '0x1'}
+with tempfile.TemporaryDirectory() as directory:
+    file_path = directory + '/participation.tx'
+    save_participation(file_path, bytes.fromhex('44' * 32))
+    print('hand counter after a restart:', cch.get_hand_counter(load_participation(file_path)) == 42)
+
+server.shutdown()
+
+# a speculative decryption has to be used only if it was computed at or after the event's block
+from Deck_prefetcher import *
+from SRA import *
+n = sra_setup(256)
+key = SRAKey(n, *sra_generate_key(n - 1))
+deck = list(range(2, 54))
+encrypted_deck = key.encrypt_many(deck)
+class Stand_in_handler:
+    def __init__(self):
+        self.dispatcher = EventDispatcher(cch.connection, cch.contract, 0)
+        self.reads = []
+    def get_deck(self, block_identifier='latest'):
+        self.reads.append(block_identifier)
+        return DeckBuffer.from_ints(encrypted_deck)
+stand_in = Stand_in_handler()
+prefetcher = DeckPrefetcher(stand_in, key)
+prefetcher.expect(0, 5)
+hands = []
+for block_number in (10, 11, 12):
+    # as for a pushed log, the listeners run before the event is delivered
+    stand_in.dispatcher.notify(block_number)
+    topdeck_index = 5 * len(hands)
+    hands.append(prefetcher.take(block_number, topdeck_index, 5))
+    prefetcher.expect(topdeck_index + 5, 5)
+stale = prefetcher.take(13, 15, 5)
+prefetcher.stop()
+print('speculative decryption:', [hand[1] for hand in hands] == [deck[0:5], deck[5:10], deck[10:15]] and
+      stale is None and stand_in.reads == [10, 11, 12] and len(stand_in.dispatcher.listeners) == 0)
+print('speculations used:', prefetcher.hits, 'discarded:', prefetcher.misses)
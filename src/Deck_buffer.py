@@ -0,0 +1,80 @@
+from Permutation import secure_shuffle
+
+# every card is stored as a big-endian uint256, exactly as the contract's ABI encodes it
+CARD_BYTES = 32
+
+class DeckBuffer:
+    # a deck kept in a single contiguous buffer of CARD_BYTES-sized cards
+    # slicing returns views on the same memory and cards are converted to int only when read
+
+    def __init__(self, data=None, size: int = 52):
+        if data is None:
+            data = bytearray(size * CARD_BYTES)
+        elif not isinstance(data, (bytearray, memoryview)):
+            data = bytearray(data)
+        if len(data) % CARD_BYTES != 0:
+            raise ValueError('Deck buffer length is not a multiple of the card size.')
+        self.view = memoryview(data)
+
+    @classmethod
+    def from_ints(cls, cards):
+        return cls(b''.join(card.to_bytes(CARD_BYTES, 'big') for card in cards))
+
+    def __len__(self):
+        return len(self.view) // CARD_BYTES
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            start, stop, step = index.indices(len(self))
+            if step != 1:
+                return DeckBuffer.from_ints([self[i] for i in range(start, stop, step)])
+            return DeckBuffer(self.view[start*CARD_BYTES : max(start, stop)*CARD_BYTES])
+
+        if index < 0:
+            index += len(self)
+        if not 0 <= index < len(self):
+            raise IndexError('Deck buffer index out of range.')
+        return int.from_bytes(self.view[index*CARD_BYTES : (index+1)*CARD_BYTES], 'big')
+
+    def __setitem__(self, index: int, card: int):
+        if index < 0:
+            index += len(self)
+        if not 0 <= index < len(self):
+            raise IndexError('Deck buffer index out of range.')
+        self.view[index*CARD_BYTES : (index+1)*CARD_BYTES] = card.to_bytes(CARD_BYTES, 'big')
+
+    def __iter__(self):
+        for index in range(len(self)):
+            yield self[index]
+
+    def __eq__(self, other):
+        if isinstance(other, DeckBuffer):
+            return self.view == other.view
+        try:
+            return self.to_ints() == list(other)
+        except TypeError:
+            return NotImplemented
+
+    def __repr__(self):
+        return f'DeckBuffer({self.to_ints()})'
+
+    def to_ints(self):
+        return list(self)
+
+    def shuffle(self):
+        # shuffles the cards in place, see Permutation.secure_shuffle
+        return secure_shuffle(self.view, CARD_BYTES)
+
+    def abi_encode(self):
+        # a static uint256[N] array is encoded as the plain concatenation of its elements
+        return self.view.tobytes()
+
+    def abi_encode_dynamic(self):
+        # uint256[] is encoded as its length followed by the elements
+        return len(self).to_bytes(CARD_BYTES, 'big') + self.view.tobytes()
+
+    def digest(self):
+        # keccak256 of the ABI encoding, the same hash the contract would compute for a commitment
+        # (eth_utils comes with web3, it is imported here so that SRA doesnt depend on it)
+        from eth_utils import keccak
+        return keccak(self.view.tobytes())
@@ -0,0 +1,86 @@
+import threading
+
+class DeckPrefetcher:
+    # speculative decryption for the draw phases, driven by the handler's Event_dispatcher.EventDispatcher:
+    # the dispatcher calls its listeners before waking up whoever waits for the event, so every new block
+    # starts a background decryption of the range this client expects next, on the deck at that block,
+    # while the main thread is still being woken up
+    # take() waits for a decryption already running on the event's block instead of repeating it,
+    # a speculation is used only if it was computed on the state the event refers to, otherwise it is discarded
+
+    def __init__(self, cch, key):
+        self.cch = cch
+        self.key = key
+        self.condition = threading.Condition()
+        self.expected = None
+        # latest block signalled by the dispatcher and last block the thread has worked on
+        self.block = None
+        self.computed_block = None
+        # (block number, topdeck_index, num_cards, encrypted cards, decrypted cards)
+        self.speculation = None
+        self.hits = 0
+        self.misses = 0
+        self.running = True
+
+        self.thread = threading.Thread(target=self.prefetch, daemon=True)
+        self.thread.start()
+        cch.dispatcher.add_listener(self.new_block)
+
+    def expect(self, topdeck_index: int, num_cards: int):
+        # sets the cards the client will most likely have to decrypt at its next draw step
+        with self.condition:
+            self.expected = (topdeck_index, num_cards)
+
+    def new_block(self, block_number: int):
+        # dispatcher listener, it runs under the dispatcher's lock so it only hands the block over to the thread
+        with self.condition:
+            if self.block is None or block_number > self.block:
+                self.block = block_number
+                self.condition.notify_all()
+
+    def prefetch(self):
+        while True:
+            with self.condition:
+                self.condition.wait_for(lambda: not self.running or (self.block is not None and self.block != self.computed_block))
+                if not self.running:
+                    return
+                block_number = self.block
+                expected = self.expected
+
+            speculation = None
+            if expected is not None:
+                try:
+                    topdeck_index, num_cards = expected
+                    encrypted = self.cch.get_deck(block_number)[topdeck_index : topdeck_index + num_cards]
+                    speculation = (block_number, topdeck_index, num_cards, encrypted, self.key.decrypt_many(encrypted))
+                # the handler exits on errors, in this thread that only means there is nothing to offer
+                except (Exception, SystemExit):
+                    pass
+
+            with self.condition:
+                if speculation is not None:
+                    self.speculation = speculation
+                self.computed_block = block_number
+                self.condition.notify_all()
+
+    def take(self, event_block: int, topdeck_index: int, num_cards: int):
+        # returns (encrypted cards, decrypted cards) if the speculation matches the event, None otherwise
+        # nothing can change the deck between the event and this client's answer,
+        # so a deck read at the event's block or later is the one the client has to work on
+        with self.condition:
+            self.condition.wait_for(lambda: not self.running or self.block is None or self.computed_block == self.block)
+            speculation = self.speculation
+            self.speculation = None
+        if (speculation is not None and event_block is not None and speculation[0] >= event_block
+                and speculation[1:3] == (topdeck_index, num_cards)):
+            self.hits += 1
+            return speculation[3:]
+        self.misses += 1
+        return None
+
+    def stop(self):
+        self.cch.dispatcher.remove_listener(self.new_block)
+        with self.condition:
+            self.running = False
+            self.condition.notify_all()
+        self.thread.join()
@@ -0,0 +1,96 @@
+from eth_utils import event_abi_to_log_topic
+import threading
+
+class EventDispatcher:
+    # reads every event of the contract through a single block cursor and sorts them by topic
+    # into one queue per event type, so that waiting for an event never needs a filter of its own
+    # logs pushed by a Log_subscription.LogSubscription are added as they arrive,
+    # when nothing is pushed for 'poll_interval' seconds the cursor is advanced with a single get_logs
+
+    def __init__(self, connection, contract, from_block: int, poll_interval: float = 1):
+        self.connection = connection
+        self.contract = contract
+        self.poll_interval = poll_interval
+        # first block not read by the cursor yet
+        self.next_block = from_block
+
+        self.names = {}
+        for abi in contract.abi:
+            if abi['type'] == 'event':
+                self.names[bytes(event_abi_to_log_topic(abi))] = abi['name']
+        self.queues = {name: [] for name in self.names.values()}
+        # (blockNumber, logIndex) of every log already queued, a log can arrive both pushed and polled
+        self.seen_logs = set()
+        # functions called with the block number whenever a new event or block is seen
+        self.listeners = []
+
+        self.condition = threading.Condition()
+
+    def add_log(self, log):
+        # decodes a raw log of the contract and appends it to the queue of its type
+        if len(log['topics']) == 0:
+            return
+        name = self.names.get(bytes(log['topics'][0]))
+        if name is None:
+            return
+
+        with self.condition:
+            log_id = (log['blockNumber'], log['logIndex'])
+            if log_id in self.seen_logs:
+                return
+            self.seen_logs.add(log_id)
+
+            # listeners run before anyone is woken, so a waiter returning with this event never reads a stale cache
+            self.notify(log['blockNumber'])
+
+            # queues only grow, the position of an event never changes
+            self.queues[name].append(getattr(self.contract.events, name)().process_log(log))
+            self.condition.notify_all()
+
+    def add_listener(self, listener):
+        self.listeners.append(listener)
+
+    def remove_listener(self, listener):
+        self.listeners.remove(listener)
+
+    def notify(self, block_number: int):
+        # a copy, listeners can be removed by other threads
+        for listener in list(self.listeners):
+            listener(block_number)
+
+    def poll(self):
+        # advances the cursor to the latest block, adding every log found on the way
+        latest_block = self.connection.eth.block_number
+        if latest_block < self.next_block:
+            return
+        logs = self.connection.eth.get_logs({'address': self.contract.address,
+                                             'fromBlock': self.next_block,
+                                             'toBlock': latest_block})
+        for log in logs:
+            self.add_log(log)
+        with self.condition:
+            self.next_block = max(self.next_block, latest_block + 1)
+        self.notify(latest_block)
+
+    def add_receipt(self, receipt):
+        # the events emitted by a transaction are all in its receipt, so they can be queued without reading any block
+        for log in receipt['logs']:
+            if log['address'].lower() == self.contract.address.lower():
+                self.add_log(log)
+
+    def snapshot(self, name: str, from_block: int):
+        # returns (last queued event of type 'name' emitted in 'from_block' or later or None, position of the next event)
+        # both are read under the same lock, so an event queued right after is always at the returned position
+        with self.condition:
+            queue = self.queues[name]
+            latest = queue[-1] if len(queue) > 0 and queue[-1]['blockNumber'] >= from_block else None
+            return (latest, len(queue))
+
+    def wait(self, name: str, position: int):
+        # returns the event of type 'name' queued at 'position', waiting for it if needed
+        while True:
+            with self.condition:
+                if self.condition.wait_for(lambda: len(self.queues[name]) > position, self.poll_interval):
+                    return self.queues[name][position]
+            # nothing was pushed in time, so the node is asked directly
+            self.poll()
@@ -0,0 +1,110 @@
+from hexbytes import HexBytes
+from web3.datastructures import AttributeDict
+import asyncio
+import itertools
+import json
+import threading
+
+try:
+    import websockets
+except ImportError:
+    websockets = None
+
+# seconds to wait before connecting again after the node closed the websocket
+RECONNECT_DELAY = 1
+
+def websocket_url(node_address: str):
+    # nodes like Ganache and Geth serve websockets on the same address as HTTP
+    if node_address.startswith('https://'):
+        return 'wss://' + node_address[len('https://'):]
+    if node_address.startswith('http://'):
+        return 'ws://' + node_address[len('http://'):]
+    return node_address
+
+def format_log(log):
+    # eth_subscribe delivers logs as plain JSON, web3 decodes them only in the same shape get_logs returns
+    formatted = dict(log)
+    for key in ('blockNumber', 'logIndex', 'transactionIndex'):
+        if isinstance(formatted.get(key), str):
+            formatted[key] = int(formatted[key], 16)
+    for key in ('blockHash', 'transactionHash', 'data'):
+        if key in formatted:
+            formatted[key] = HexBytes(formatted[key])
+    formatted['topics'] = [HexBytes(topic) for topic in formatted.get('topics', [])]
+    return AttributeDict(formatted)
+
+class LogSubscription:
+    # pushes the contract's logs from the node through eth_subscribe over a websocket, on a background thread
+    # every log is handed to 'on_log' (the handler's Event_dispatcher.EventDispatcher), which wakes up whoever is waiting
+    # if the websocket cannot be opened nothing is pushed, and the dispatcher falls back to polling
+
+    def __init__(self, url: str, address: str, on_log=None):
+        self.url = url
+        self.address = address
+        self.on_log = on_log
+        self.connected = False
+        self.connection = None
+        self.running = websockets is not None
+        self.request_ids = itertools.count(1)
+
+        self.loop = asyncio.new_event_loop()
+        self.thread = threading.Thread(target=self.run, daemon=True)
+        if self.running:
+            self.task = self.loop.create_task(self.listen())
+            self.thread.start()
+
+    def run(self):
+        try:
+            self.loop.run_until_complete(self.task)
+        except asyncio.CancelledError:
+            pass
+
+    async def listen(self):
+        while self.running:
+            try:
+                async with websockets.connect(self.url) as connection:
+                    await self.subscribe(connection)
+                    self.connection = connection
+                    self.connected = True
+                    async for message in connection:
+                        self.receive(json.loads(message))
+            except Exception:
+                pass
+            self.connection = None
+            self.connected = False
+            if self.running:
+                await asyncio.sleep(RECONNECT_DELAY)
+
+    async def subscribe(self, connection):
+        request_id = next(self.request_ids)
+        await connection.send(json.dumps({'jsonrpc': '2.0', 'id': request_id, 'method': 'eth_subscribe',
+                                          'params': ['logs', {'address': self.address}]}))
+        # notifications can only start once the subscription id has been returned
+        while True:
+            response = json.loads(await connection.recv())
+            if response.get('id') == request_id:
+                if 'error' in response:
+                    raise Exception(response['error'])
+                return response['result']
+
+    def receive(self, message):
+        if message.get('method') != 'eth_subscription':
+            return
+        log = format_log(message['params']['result'])
+        # logs of removed (reorganized) blocks are not events anymore
+        if log.get('removed', False):
+            return
+        if self.on_log is not None:
+            self.on_log(log)
+
+    def stop(self):
+        self.running = False
+        if not self.thread.is_alive():
+            return
+        # an open connection is closed cleanly, which ends the listening loop
+        connection = self.connection
+        if connection is not None:
+            asyncio.run_coroutine_threadsafe(connection.close(), self.loop)
+        else:
+            self.loop.call_soon_threadsafe(self.task.cancel)
+        self.thread.join()
@@ -0,0 +1,134 @@
+from Log_subscription import *
+from web3 import Web3
+from eth_abi import encode
+import asyncio
+import json
+import threading
+import time
+
+# a stand-in node: answers eth_subscribe and pushes the logs it is given
+node_loop = asyncio.new_event_loop()
+node_connections = []
+
+async def node_handler(connection, *args):
+    async for message in connection:
+        request = json.loads(message)
+        if request['method'] == 'eth_subscribe':
+            await connection.send(json.dumps({'jsonrpc': '2.0', 'id': request['id'], 'result': '0x1'}))
+            node_connections.append(connection)
+
+async def start_node():
+    return await websockets.serve(node_handler, '127.0.0.1', 0)
+
+server = node_loop.run_until_complete(start_node())
+port = server.sockets[0].getsockname()[1]
+threading.Thread(target=node_loop.run_forever, daemon=True).start()
+
+def push_log(log):
+    message = {'jsonrpc': '2.0', 'method': 'eth_subscription', 'params': {'subscription': '0x1', 'result': log}}
+    for connection in node_connections:
+        asyncio.run_coroutine_threadsafe(connection.send(json.dumps(message)), node_loop).result()
+
+with open('../abi.json') as file:
+    contract = Web3().eth.contract(abi=json.load(file))
+
+contract_address = '0x' + '11' * 20
+draw_log = {'address': contract_address,
+            'topics': [Web3.to_hex(Web3.keccak(text='draw_event(uint8,uint8,uint8,uint8)'))],
+            'data': Web3.to_hex(encode(['uint8', 'uint8', 'uint8', 'uint8'], [2, 1, 5, 5])),
+            'blockNumber': '0x2a', 'blockHash': '0x' + '22' * 32, 'transactionHash': '0x' + '33' * 32,
+            'transactionIndex': '0x0', 'logIndex': '0x0', 'removed': False}
+
+print('websocket url:', websocket_url('http://127.0.0.1:7545') == 'ws://127.0.0.1:7545')
+
+# pushed logs have to reach the waiting thread and be decodable by web3
+received = []
+arrived = threading.Event()
+def on_log(log):
+    received.append(log)
+    arrived.set()
+subscription = LogSubscription(f'ws://127.0.0.1:{port}', contract_address, on_log=on_log)
+while not subscription.connected:
+    time.sleep(0.01)
+
+start = time.perf_counter()
+threading.Timer(0.05, push_log, args=(draw_log,)).start()
+arrived.wait(5)
+latency = time.perf_counter() - start - 0.05
+event = contract.events.draw_event().process_log(received[0])
+print('pushed log:', len(received) == 1 and event['args']['draw_index'] == 1 and event['blockNumber'] == 42)
+print(f'wake-up latency: {latency*1000:.2f} ms')
+
+# logs of removed blocks are ignored
+arrived.clear()
+push_log(dict(draw_log, removed=True))
+print('removed log ignored:', not arrived.wait(0.2) and len(received) == 1)
+subscription.stop()
+
+# with no node listening nothing is pushed, so the dispatcher has to fall back to polling
+fallback = LogSubscription('ws://127.0.0.1:1', contract_address, on_log=on_log)
+time.sleep(0.2)
+print('polling fallback:', not fallback.connected and len(received) == 1)
+fallback.stop()
+
+# the dispatcher has to queue a log once, whether it was pushed, polled or both
+from Event_dispatcher import *
+from web3.datastructures import AttributeDict
+
+class Stand_in_eth:
+    block_number = 42
+    def get_logs(self, parameters):
+        return [format_log(draw_log)] if parameters['fromBlock'] <= 42 <= parameters['toBlock'] else []
+
+contract.address = contract_address
+dispatcher = EventDispatcher(AttributeDict({'eth': Stand_in_eth()}), contract, 40, poll_interval=0.05)
+dispatcher.add_log(format_log(draw_log))
+dispatcher.poll()
+event = dispatcher.wait('draw_event', 0)
+print('dispatched log:', event['args']['topdeck_index'] == 5 and dispatcher.snapshot('draw_event', 0)[1] == 1 and dispatcher.next_block == 43)
+print('latest event:', dispatcher.snapshot('draw_event', 42) == (event, 1) and dispatcher.snapshot('draw_event', 43) == (None, 1))
+
+# the events of a receipt are queued with the same deduplication
+receipt = AttributeDict({'logs': [format_log(draw_log), format_log(dict(draw_log, logIndex='0x1'))]})
+dispatcher.add_receipt(receipt)
+print('receipt events:', dispatcher.snapshot('draw_event', 0)[1] == 2)
+
+# state views have to be dropped as soon as the dispatcher sees a new event, constants only once set
+from Read_cache import *
+cache = ReadCache()
+dispatcher.add_listener(cache.invalidate)
+reads = []
+def read_bets():
+    reads.append(1)
+    return [len(reads)]
+cache.state_view('bets', read_bets)
+cached = cache.state_view('bets', read_bets)
+dispatcher.add_log(format_log(dict(draw_log, logIndex='0x2')))
+fresh = cache.state_view('bets', read_bets)
+cache.constant('n', lambda: 0, lambda n: n != 0)
+n = cache.constant('n', lambda: 7, lambda n: n != 0)
+print('read cache:', cached == [1] and fresh == [2] and n == 7 and cache.stats() == {'hits': 1, 'misses': 4})
+
+# a cached deck buffer has to be copied as well, shuffling or writing the one returned must not change it
+from Deck_buffer import *
+cache.state_view('deck', lambda: DeckBuffer.from_ints(range(52)))
+deck = cache.state_view('deck', lambda: None)
+deck[0] = 99
+deck[1:3][0] = 98
+print('cached deck copied:', cache.state_view('deck', lambda: None).to_ints() == list(range(52)))
+
+# a waiter woken by a pushed event has to find the cache already invalidated, even behind a slow listener
+dispatcher = EventDispatcher(AttributeDict({'eth': Stand_in_eth()}), contract, 40, poll_interval=5)
+cache = ReadCache()
+dispatcher.add_listener(lambda block_number: time.sleep(0.1))
+dispatcher.add_listener(cache.invalidate)
+cache.state_view('bets', lambda: [0])
+woken = []
+def waiter():
+    dispatcher.wait('draw_event', 0)
+    woken.append(cache.state_view('bets', lambda: [1]))
+thread = threading.Thread(target=waiter)
+thread.start()
+dispatcher.add_log(format_log(draw_log))
+thread.join()
+print('cache dropped before waking:', woken == [[1]])
@@ -0,0 +1,52 @@
+import os
+
+# bytes drawn from the CSPRNG for every swap, a 32-bit word keeps the rejection rate negligible
+WORD_BYTES = 4
+WORD_RANGE = 1 << (8 * WORD_BYTES)
+
+def _random_words(count: int):
+    return memoryview(os.urandom(count * WORD_BYTES)).cast('I')
+
+def secure_shuffle(deck, record_size: int = None):
+    # unbiased Fisher-Yates shuffle of 'deck' in place, fed by a single bulk os.urandom draw
+    # 'deck' can be a list, an array.array or a bytearray of fixed-size records of 'record_size' bytes
+    # returns (permutation, inverse): new_deck[i] == old_deck[permutation[i]] and
+    # old_deck[j] == new_deck[inverse[j]]
+    if record_size is None:
+        size = len(deck)
+    else:
+        size = len(deck) // record_size
+        view = memoryview(deck)
+
+    permutation = list(range(size))
+    words = _random_words(size)
+    word_index = 0
+
+    for i in reversed(range(1, size)):
+        # rejection sampling removes the modulo bias
+        bound = i + 1
+        limit = WORD_RANGE - WORD_RANGE % bound
+        while True:
+            if word_index == len(words):
+                words = _random_words(size)
+                word_index = 0
+            word = words[word_index]
+            word_index += 1
+            if word < limit:
+                break
+        j = word % bound
+
+        if i != j:
+            permutation[i], permutation[j] = permutation[j], permutation[i]
+            if record_size is None:
+                deck[i], deck[j] = deck[j], deck[i]
+            else:
+                record = bytes(view[i*record_size : (i+1)*record_size])
+                view[i*record_size : (i+1)*record_size] = view[j*record_size : (j+1)*record_size]
+                view[j*record_size : (j+1)*record_size] = record
+
+    inverse = [0] * size
+    for new_index, old_index in enumerate(permutation):
+        inverse[old_index] = new_index
+
+    return (permutation, inverse)
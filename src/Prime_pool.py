@@ -0,0 +1,88 @@
+from SRA import sra_generate_prime
+import json
+import os
+import threading
+
+class PrimePool:
+    # keeps 'size' ready primes for each bit size, refilling them on a background thread
+    # and persisting them to 'file_path' (if given) so that restarts start warm
+
+    def __init__(self, bit_sizes, size: int = 4, file_path: str = None):
+        self.size = size
+        self.file_path = file_path
+        self.primes = {bits: [] for bits in bit_sizes}
+        self.lock = threading.Lock()
+        self.refill_needed = threading.Event()
+        self.running = True
+
+        self.load()
+
+        self.thread = threading.Thread(target=self.refill, daemon=True)
+        self.thread.start()
+        self.refill_needed.set()
+
+    def get(self, bits: int):
+        # returns a ready prime, or None if there is none for this bit size
+        with self.lock:
+            if bits not in self.primes:
+                self.primes[bits] = []
+            ready = self.primes[bits]
+            prime = ready.pop() if len(ready) > 0 else None
+            # a consumed prime is never handed out again, even after a restart
+            if prime is not None:
+                self.save()
+
+        self.refill_needed.set()
+        return prime
+
+    def available(self, bits: int):
+        with self.lock:
+            return len(self.primes.get(bits, []))
+
+    def refill(self):
+        while self.running:
+            self.refill_needed.wait()
+            self.refill_needed.clear()
+
+            for bits in list(self.primes):
+                while self.running and self.available(bits) < self.size:
+                    # the expensive search runs outside the lock
+                    prime = sra_generate_prime(bits)
+                    with self.lock:
+                        self.primes[bits].append(prime)
+                        self.save()
+
+    def stop(self):
+        self.running = False
+        self.refill_needed.set()
+        self.thread.join()
+
+    def load(self):
+        if self.file_path is None:
+            return
+
+        try:
+            with open(self.file_path) as file:
+                stored = json.load(file)
+        except FileNotFoundError:
+            return
+        except ValueError:
+            print('Prime pool file is corrupted, starting from an empty pool.')
+            return
+
+        for bits in self.primes:
+            primes = [int(prime, 16) for prime in stored.get(str(bits), [])]
+            # ignoring entries that dont match the requested size
+            self.primes[bits] = [prime for prime in primes if prime.bit_length() == bits][:self.size]
+
+    def save(self):
+        # must be called holding the lock
+        if self.file_path is None:
+            return
+
+        stored = {str(bits): [hex(prime) for prime in primes] for bits, primes in self.primes.items()}
+        temporary_path = self.file_path + '.tmp'
+        with open(temporary_path, 'w') as file:
+            json.dump(stored, file)
+        # replacing the file atomically so that a crash never leaves it half written
+        os.replace(temporary_path, self.file_path)
@@ -0,0 +1,85 @@
+from SRA import is_probable_prime, is_quadratic_residue
+
+def jacobi_symbol(num: int, mod: int):
+    # binary Jacobi symbol algorithm, mod must be odd and positive
+    num %= mod
+    result = 1
+    while num != 0:
+        # removing factors of 2: (2/mod) = -1 when mod = 3 or 5 (mod 8)
+        trailing_zeros = (num & -num).bit_length() - 1
+        num >>= trailing_zeros
+        if trailing_zeros & 1 and mod & 7 in (3, 5):
+            result = -result
+
+        # quadratic reciprocity
+        num, mod = mod, num
+        if num & 3 == 3 and mod & 3 == 3:
+            result = -result
+        num %= mod
+
+    if mod == 1:
+        return result
+    else:
+        return 0
+
+def smallest_prime_factors(limit: int):
+    # spf[i] is the smallest prime dividing i (spf[0] = spf[1] = 0)
+    spf = [0] * limit
+    for i in range(2, limit):
+        if spf[i] == 0:
+            for j in range(i, limit, i):
+                if spf[j] == 0:
+                    spf[j] = i
+    return spf
+
+def classify_range(n: int, lo: int, hi: int):
+    # returns the symbols (num/n) for every num in [lo, hi)
+    # since the symbol is multiplicative only primes need to be computed,
+    # composites are derived from their smallest prime factor
+    lo = max(lo, 0)
+    if hi <= lo:
+        return []
+
+    spf = smallest_prime_factors(hi)
+    symbols = [0] * hi
+    if hi > 1:
+        symbols[1] = 1
+    for i in range(2, hi):
+        p = spf[i]
+        if p == i:
+            symbols[i] = jacobi_symbol(i, n)
+        else:
+            symbols[i] = symbols[p] * symbols[i // p]
+
+    return symbols[lo:hi]
+
+def quadratic_residues(n: int, count: int, start: int = 2):
+    # returns the first 'count' quadratic residues modulo n starting from 'start'
+    # half of the numbers are quadratic residues, so 2*count candidates are usually enough
+    hi = start + 2 * count + 16
+    while True:
+        residues = [start + offset for offset, symbol in enumerate(classify_range(n, start, min(hi, n))) if symbol == 1]
+        if len(residues) >= count or hi >= n:
+            return residues[:count]
+        hi *= 2
+
+def validate_coding(n: int, codes):
+    # returns the index of the first code that is not a quadratic residue modulo n, None otherwise
+    if len(codes) == 0:
+        return None
+
+    # the Jacobi symbol is the Legendre symbol only when n is prime, a composite n
+    # has Jacobi symbol 1 on non-residues too, so every code is checked with Euler's criterion like the contract does
+    if not is_probable_prime(n):
+        for index, code in enumerate(codes):
+            if is_quadratic_residue(code, n) != 1:
+                return index
+        return None
+
+    symbols = classify_range(n, 0, max(codes) + 1)
+    for index, code in enumerate(codes):
+        if symbols[code] != 1:
+            # the contract uses Euler's criterion, so the verdict is confirmed with it before being reported
+            if is_quadratic_residue(code, n) != 1:
+                return index
+    return None
@@ -0,0 +1,73 @@
+from Deck_buffer import *
+import threading
+
+class ReadCache:
+    # two-tier cache for the contract's view functions
+    # constants are kept for the whole life of the cache, a value that is not set yet (like n before the shuffle) is not cached
+    # state views are kept until invalidate() is called, which happens whenever a new block or event is seen
+
+    def __init__(self):
+        self.constants = {}
+        self.state = {}
+        self.hits = 0
+        self.misses = 0
+        self.lock = threading.Lock()
+
+    def constant(self, name: str, read, is_set=lambda value: True):
+        with self.lock:
+            if name in self.constants:
+                self.hits += 1
+                return self.copy(self.constants[name])
+            self.misses += 1
+
+        value = read()
+        if is_set(value):
+            with self.lock:
+                self.constants[name] = value
+        return self.copy(value)
+
+    def state_view(self, name: str, read):
+        with self.lock:
+            if name in self.state:
+                self.hits += 1
+                return self.copy(self.state[name])
+            self.misses += 1
+            generation = self.state
+
+        value = read()
+        with self.lock:
+            # the value is dropped if the cache was invalidated while it was being read
+            if generation is self.state:
+                self.state[name] = value
+        return self.copy(value)
+
+    def generation(self):
+        # token of the state views cached now, every invalidate() starts a new one
+        with self.lock:
+            return self.state
+
+    def is_current(self, generation):
+        # whether nothing was invalidated since 'generation' was taken
+        with self.lock:
+            return generation is self.state
+
+    def cached(self, name: str):
+        with self.lock:
+            return name in self.constants or name in self.state
+
+    def invalidate(self, block_number: int = None):
+        # 'block_number' is the block the dispatcher has just seen, any new block makes the state views stale
+        with self.lock:
+            self.state = {}
+
+    def copy(self, value):
+        # callers may modify the lists and deck buffers they get, the cached ones must not change
+        if isinstance(value, list):
+            return list(value)
+        if isinstance(value, DeckBuffer):
+            return DeckBuffer(bytearray(value.view))
+        return value
+
+    def stats(self):
+        with self.lock:
+            return {'hits': self.hits, 'misses': self.misses}
@@ -1,15 +1,221 @@
-from Crypto.Util import number
+from concurrent.futures import ProcessPoolExecutor
+from Deck_buffer import DeckBuffer
+from bisect import bisect_right
+from itertools import repeat
+from math import gcd
+import atexit
+import hashlib
+import hmac
+import multiprocessing
+import os
+import secrets
+
+# the big-integer backend is chosen once at import time:
+# gmpy2 is used when installed, otherwise the builtin pow
+try:
+    from gmpy2 import mpz, powmod
+    BACKEND = 'gmpy2'
+    _modexp = powmod
+    # converts an operand to the backend's native type
+    _to_backend = mpz
+
+    def _deck_pow(cards, exponent: int, mod: int):
+        exponent = mpz(exponent)
+        mod = mpz(mod)
+        return [int(powmod(card, exponent, mod)) for card in cards]
+except ImportError:
+    BACKEND = 'builtin'
+    _modexp = pow
+    _to_backend = int
+
+    def _deck_pow(cards, exponent: int, mod: int):
+        return [pow(card, exponent, mod) for card in cards]
+
+# once enabled, deck operations with a modulus of at least 'min_bits' bits
+# are spread card by card over a long-lived pool of worker processes
+PARALLEL_MIN_BITS = 1024
+_pool = None
+_pool_workers = 0
+_parallel_min_bits = PARALLEL_MIN_BITS
+
+def _card_pow(card: int, exponent: int, mod: int):
+    return _deck_pow([card], exponent, mod)[0]
+
+def enable_parallel_decks(workers: int = None, min_bits: int = PARALLEL_MIN_BITS):
+    global _pool, _pool_workers, _parallel_min_bits
+    _parallel_min_bits = min_bits
+    if _pool is not None:
+        return
+
+    _pool_workers = workers or os.cpu_count() or 1
+    # the client already runs threads (websocket, prime pool) when the pool is created, and forking a process
+    # with threads can leave their locks held in the child: workers are started from a clean server process instead
+    start_method = 'forkserver' if 'forkserver' in multiprocessing.get_all_start_methods() else 'spawn'
+    _pool = ProcessPoolExecutor(max_workers=_pool_workers, mp_context=multiprocessing.get_context(start_method))
+    # warming up every worker so that the first hand doesnt pay for process start-up
+    list(_pool.map(_card_pow, [2] * _pool_workers, repeat(3), repeat(5)))
+    atexit.register(disable_parallel_decks)
+
+def disable_parallel_decks():
+    global _pool, _pool_workers
+    if _pool is not None:
+        _pool.shutdown()
+        _pool = None
+        _pool_workers = 0
+
+def _batch_pow(cards, exponent: int, mod: int):
+    # DeckBuffer in, DeckBuffer out
+    if isinstance(cards, DeckBuffer):
+        return DeckBuffer.from_ints(_batch_pow(cards.to_ints(), exponent, mod))
+
+    # below the threshold the inter-process overhead outweighs the modexps
+    if _pool is None or len(cards) < 2 or mod.bit_length() < _parallel_min_bits:
+        return _deck_pow(cards, exponent, mod)
+
+    chunk_size = -(-len(cards) // _pool_workers)
+    return list(_pool.map(_card_pow, cards, repeat(exponent), repeat(mod), chunksize=chunk_size))
+
+# optional source of ready primes (see Prime_pool.py) used by sra_setup
+_prime_pool = None
+
+def set_prime_pool(pool):
+    global _prime_pool
+    _prime_pool = pool
+
+def _sieve(limit: int):
+    is_prime = bytearray([1]) * limit
+    is_prime[0:2] = b'\x00\x00'
+    for i in range(2, int(limit ** 0.5) + 1):
+        if is_prime[i]:
+            is_prime[i*i::i] = bytes(len(range(i*i, limit, i)))
+    return [i for i in range(limit) if is_prime[i]]
+
+SMALL_PRIMES = _sieve(2 ** 15)
+
+def _miller_rabin_rounds(bits: int):
+    # rounds needed for an error probability below 2^-80 on random candidates
+    # (Handbook of Applied Cryptography, table 4.4)
+    for min_bits, rounds in ((1300, 2), (850, 3), (650, 4), (550, 5), (450, 6), (400, 7),
+                             (350, 8), (300, 9), (250, 12), (200, 15), (150, 18), (100, 27)):
+        if bits >= min_bits:
+            return rounds
+    return 40
+
+def _miller_rabin(candidate: int, rounds: int):
+    d = candidate - 1
+    s = (d & -d).bit_length() - 1
+    d >>= s
+
+    for attempt in range(rounds):
+        # base 2 first since it rejects almost every composite at the lowest cost
+        base = 2 if attempt == 0 else 2 + secrets.randbelow(candidate - 3)
+        x = _modexp(base, d, candidate)
+        if x == 1 or x == candidate - 1:
+            continue
+        for _ in range(s - 1):
+            x = _modexp(x, 2, candidate)
+            if x == candidate - 1:
+                break
+        else:
+            return False
+    return True
+
+def is_probable_prime(candidate: int):
+    if candidate < 2:
+        return False
+    for p in SMALL_PRIMES:
+        if candidate % p == 0:
+            return candidate == p
+    return _miller_rabin(candidate, _miller_rabin_rounds(candidate.bit_length()))
+
+def sra_generate_prime(bits: int):
+    # the two top bits are forced, so the result always has exactly 'bits' bits
+    # and is at least 2^(bits-2) as required by the contract
+    if bits < 12:
+        while True:
+            candidate = secrets.randbits(bits) | (3 << (bits-2)) | 1
+            if is_probable_prime(candidate):
+                return candidate
+
+    rounds = _miller_rabin_rounds(bits)
+    # number of consecutive odd candidates sieved at once,
+    # a few times the average gap between primes of this size
+    window = max(64, bits)
+    # bigger candidates make Miller-Rabin more expensive, so it pays to sieve deeper
+    sieve_primes = SMALL_PRIMES[1:bisect_right(SMALL_PRIMES, 8 * bits)]
+
+    while True:
+        start = secrets.randbits(bits) | (3 << (bits-2)) | 1
+
+        # composite[i] is set when start + 2*i is divisible by a small prime
+        composite = bytearray(window)
+        for p in sieve_primes:
+            first = (p - start % p) * ((p + 1) // 2) % p
+            composite[first::p] = b'\x01' * len(range(first, window, p))
+
+        # only the survivors of the sieve pay for Miller-Rabin
+        for i in range(window):
+            if not composite[i]:
+                candidate = start + 2*i
+                if candidate.bit_length() > bits:
+                    break
+                if _miller_rabin(candidate, rounds):
+                    return candidate
 
 def sra_setup(bits: int):
-    n = 0
-    while n < 2 ** (bits-2):
-       n = number.getPrime(bits)
-    return n
+    if _prime_pool is not None:
+        n = _prime_pool.get(bits)
+        if n is not None:
+            return n
+    # generating inline only when the pool is empty
+    return sra_generate_prime(bits)
+
+def sra_generate_key(phi: int, bits: int = None):
+    # e only has to be coprime with phi, so a random odd number replaces the prime search
+    # since every card coding is public, e must stay large to resist discrete log searches
+    if bits is None:
+        bits = phi.bit_length() - 1
+    if not 2 <= bits <= phi.bit_length():
+        raise ValueError('Key size must be between 2 and the size of phi.')
+
+    while True:
+        e = secrets.randbits(bits) | (1 << (bits-1)) | 1
+        if e < phi and gcd(e, phi) == 1:
+            d = pow(e, -1, phi)
+            return (e, d)
 
-def sra_generate_key(phi: int):
-    e = number.getPrime(phi.bit_length() - 1)
-    d = pow(e, -1, phi)
-    return (e, d)
+def _hkdf_sha256(master_secret: bytes, salt: bytes, info: bytes, length: int):
+    # HKDF (RFC 5869) extract and expand steps
+    pseudo_random_key = hmac.new(salt, master_secret, hashlib.sha256).digest()
+    output = b''
+    block = b''
+    counter = 1
+    while len(output) < length:
+        block = hmac.new(pseudo_random_key, block + info + bytes([counter]), hashlib.sha256).digest()
+        output += block
+        counter += 1
+    return output[:length]
+
+def sra_derive_key(master_secret: bytes, contract_address: str, hand_counter: int, phi: int, bits: int = None):
+    # deterministic version of sra_generate_key: the same master secret, contract and hand
+    # always give the same key, so a restarted client can recompute it instead of storing it
+    if bits is None:
+        bits = phi.bit_length() - 1
+    if not 2 <= bits <= phi.bit_length():
+        raise ValueError('Key size must be between 2 and the size of phi.')
+
+    salt = contract_address.lower().encode()
+    length = (bits + 7) // 8
+    phi_bytes = phi.to_bytes((phi.bit_length() + 7) // 8, 'big')
+    attempt = 0
+    while True:
+        info = b'SRA key' + hand_counter.to_bytes(32, 'big') + phi_bytes + attempt.to_bytes(4, 'big')
+        e = int.from_bytes(_hkdf_sha256(master_secret, salt, info, length), 'big') >> (8*length - bits)
+        e |= (1 << (bits-1)) | 1
+        if e < phi and gcd(e, phi) == 1:
+            d = pow(e, -1, phi)
+            return (e, d)
+        attempt += 1
 
 def sra_encrypt(plain_text: int, e: int, n: int):
     return pow(plain_text, e, n)
@@ -17,12 +223,152 @@ def sra_encrypt(plain_text: int, e: int, n: int):
 def sra_decrypt(cypher_text: int, d: int, n: int):
     return pow(cypher_text, d, n)
 
-def shuffle(deck, permutation):
-    new_deck = []
-    for index in permutation:
-        new_deck.append(deck[index])
+def encrypt_deck(cards, e: int, n: int):
+    return _batch_pow(cards, e, n)
 
-    return new_deck
+def decrypt_deck(cards, d: int, n: int):
+    return _batch_pow(cards, d, n)
+
+class SRAKey:
+    # a player's SRA key pair under modulus n
+    # the same exponents are applied to every card of the hand, so their backend operands are prepared once
+
+    def __init__(self, n: int, e: int, d: int):
+        self.n = n
+        self.e = e
+        self.d = d
+        self._n = _to_backend(n)
+        self._e = _to_backend(e)
+        self._d = _to_backend(d)
+
+    def encrypt(self, card: int):
+        return self.encrypt_many([card])[0]
+
+    def decrypt(self, card: int):
+        return self.decrypt_many([card])[0]
+
+    def encrypt_many(self, cards):
+        return _batch_pow(cards, self._e, self._n)
+
+    def decrypt_many(self, cards):
+        return _batch_pow(cards, self._d, self._n)
+
+def verify_chain(deck_coding, final_deck, keys, n: int, steps=None):
+    # checks that final_deck is the deck coding encrypted (and shuffled) by every key in 'keys'
+    # since n is prime, encrypting with e1 and then e2 equals encrypting once with e1*e2 mod (n-1),
+    # so every card costs a single modexp instead of one per player
+    composed_key = 1
+    for e in keys:
+        composed_key = composed_key * e % (n-1)
+
+    final_cards = set(final_deck)
+    mismatch = None
+    for card_index, card in enumerate(encrypt_deck(deck_coding, composed_key, n)):
+        if card not in final_cards:
+            mismatch = card_index
+            break
+
+    if mismatch is None:
+        return None
+
+    # 'steps' holds the deck published by every player, like the contract's shuffle_steps;
+    # when available the chain is replayed layer by layer to find the culprit
+    if steps is None:
+        return (None, mismatch)
+
+    deck = list(deck_coding)
+    for player_index, e in enumerate(keys):
+        deck = encrypt_deck(deck, e, n)
+        step_cards = set(steps[player_index])
+        for card_index, card in enumerate(deck):
+            if card not in step_cards:
+                return (player_index, card_index)
+
+    # every step is consistent, so the final deck doesnt match the last step
+    return (len(keys), mismatch)
+
+def _weighted_product(bases, weights, n: int):
+    # product of bases[i]^weights[i] mod n, the short exponents keep every modexp cheap
+    result = 1
+    for base, weight in zip(bases, weights):
+        result = result * _modexp(base, weight, n) % n
+    return result
+
+def batch_verify(inputs, outputs, e: int, n: int, permutation=None, soundness_bits: int = 40):
+    # checks that outputs[i] == inputs[permutation[i]]^e mod n for every i (positionally without a permutation)
+    # using a handful of modexps: by multiplicative homomorphism prod(x_i^r_i)^e == prod(y_i^r_i) for random r_i
+    # an error y_i / x_i^e of large order passes with probability about 2^-soundness_bits,
+    # one confined to a subgroup of small order q dividing n-1 passes with probability 1/q
+    # for odd e the Jacobi symbol of every pair is compared as well, which catches every error that is not a square,
+    # negated outputs included when n = 3 (mod 4): for n = 1 (mod 4) they still pass with probability 1/2
+    # (QR imports this module, so jacobi_symbol can only be imported here)
+    from QR import jacobi_symbol
+
+    if len(inputs) != len(outputs):
+        return False
+    if permutation is not None:
+        inputs = [inputs[index] for index in permutation]
+
+    # x -> x^e keeps the Jacobi symbol when e is odd
+    if e & 1:
+        for x, y in zip(inputs, outputs):
+            if jacobi_symbol(x, n) != jacobi_symbol(y, n):
+                return False
+
+    # uniform weights: forcing them odd would let every even number of negated outputs through
+    weights = [secrets.randbits(soundness_bits) for _ in inputs]
+    return _modexp(_weighted_product(inputs, weights, n), e, n) == _weighted_product(outputs, weights, n)
+
+class MontgomeryContext:
+    # residues are kept in Montgomery form x*R mod n (R = 2^k > n), so decks going through
+    # several operations under the same modulus only get converted at the boundaries
+
+    def __init__(self, n: int):
+        self.n = n
+        self.bits = n.bit_length()
+        self.mask = (1 << self.bits) - 1
+        # n_prime * n = -1 mod R, used by the reduction
+        self.n_prime = -pow(n, -1, 1 << self.bits) & self.mask
+
+    def to_montgomery(self, x: int):
+        return (x << self.bits) % self.n
+
+    def from_montgomery(self, x: int):
+        return self.reduce(x)
+
+    def to_montgomery_deck(self, cards):
+        return [(int(card) << self.bits) % self.n for card in cards]
+
+    def from_montgomery_deck(self, cards):
+        return [self.reduce(card) for card in cards]
+
+    def reduce(self, t: int):
+        # REDC: returns t * R^-1 mod n for 0 <= t < n*R without any division by n
+        m = (t & self.mask) * self.n_prime & self.mask
+        u = (t + m * self.n) >> self.bits
+        if u >= self.n:
+            return u - self.n
+        return u
+
+    def multiply(self, a: int, b: int):
+        return self.reduce(a * b)
+
+    def pow_deck(self, cards, exponent: int):
+        # left-to-right square and multiply on a whole deck in Montgomery form: every product is brought back
+        # to the form with a REDC, and the cards go through the bits of the shared exponent in lock-step
+        if exponent == 0:
+            return [self.to_montgomery(1)] * len(cards)
+        cards = [int(card) for card in cards]
+        results = list(cards)
+        for bit in bin(exponent)[3:]:
+            results = [self.reduce(result * result) for result in results]
+            if bit == '1':
+                results = [self.reduce(result * card) for result, card in zip(results, cards)]
+        return results
+
+def shuffle(deck, permutation):
+    # new_deck[i] = deck[permutation[i]], see Permutation.secure_shuffle for the in place version
+    return [deck[index] for index in permutation]
 
 def is_quadratic_residue(num: int, mod: int):
     if num % mod == 0:
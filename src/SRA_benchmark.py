@@ -0,0 +1,210 @@
+from SRA import *
+from Shuffle_auditor import *
+from Cipher import *
+from Permutation import *
+import random
+import time
+
+DECK_SIZE = 52
+REPETITIONS = 5
+
+def measure(function, *args, repetitions=REPETITIONS):
+    # returns the best time (in seconds) out of 'repetitions' runs
+    best = None
+    for _ in range(repetitions):
+        start = time.perf_counter()
+        function(*args)
+        elapsed = time.perf_counter() - start
+        if best is None or elapsed < best:
+            best = elapsed
+    return best
+
+def measure_mean(function, *args, repetitions=REPETITIONS):
+    # prime searches have a random duration, so their mean time is reported
+    start = time.perf_counter()
+    for _ in range(repetitions):
+        function(*args)
+    return (time.perf_counter() - start) / repetitions
+
+def builtin_encrypt_deck(cards, e, n):
+    return [pow(card, e, n) for card in cards]
+
+def benchmark_deck_backend(bits):
+    n = sra_setup(bits)
+    e, d = sra_generate_key(n-1)
+    deck = list(range(2, 2 + DECK_SIZE))
+
+    builtin_time = measure(builtin_encrypt_deck, deck, e, n)
+    backend_time = measure(encrypt_deck, deck, e, n)
+    print(f'{bits:>5} bits | builtin pow: {builtin_time*1000:8.2f} ms | {BACKEND}: {backend_time*1000:8.2f} ms | speedup: {builtin_time/backend_time:5.2f}x')
+
+def benchmark_parallel_decks(bits):
+    n = sra_setup(bits)
+    e, d = sra_generate_key(n-1)
+    deck = list(range(2, 2 + DECK_SIZE))
+
+    disable_parallel_decks()
+    serial_time = measure(encrypt_deck, deck, e, n)
+    enable_parallel_decks(min_bits=0)
+    parallel_time = measure(encrypt_deck, deck, e, n)
+    disable_parallel_decks()
+    print(f'{bits:>5} bits | serial: {serial_time*1000:8.2f} ms | process pool: {parallel_time*1000:8.2f} ms | speedup: {serial_time/parallel_time:5.2f}x')
+
+def benchmark_prime_generation(bits):
+    native_time = measure_mean(sra_generate_prime, bits)
+    try:
+        from Crypto.Util import number
+    except ImportError:
+        print(f'{bits:>5} bits | sra_generate_prime: {native_time*1000:9.2f} ms | getPrime: pycryptodome not installed')
+        return
+
+    reference_time = measure_mean(number.getPrime, bits)
+    print(f'{bits:>5} bits | sra_generate_prime: {native_time*1000:9.2f} ms | getPrime: {reference_time*1000:9.2f} ms | speedup: {reference_time/native_time:5.2f}x')
+
+def replay_chain(deck_coding, final_deck, keys, n):
+    deck = list(deck_coding)
+    for e in keys:
+        deck = encrypt_deck(deck, e, n)
+    return set(deck) == set(final_deck)
+
+def benchmark_chain_verification(bits, players=3):
+    n = sra_setup(bits)
+    keys = [sra_generate_key(n-1)[0] for _ in range(players)]
+    deck_coding = list(range(2, 2 + DECK_SIZE))
+    final_deck = deck_coding
+    for e in keys:
+        final_deck = encrypt_deck(final_deck, e, n)
+
+    replay_time = measure(replay_chain, deck_coding, final_deck, keys, n)
+    composed_time = measure(verify_chain, deck_coding, final_deck, keys, n)
+    print(f'{bits:>5} bits | layer replay: {replay_time*1000:8.2f} ms | composed key: {composed_time*1000:8.2f} ms | speedup: {replay_time/composed_time:5.2f}x')
+
+def build_shuffle_steps(deck_coding, keys, n):
+    steps = []
+    deck = deck_coding
+    for e in keys:
+        deck = encrypt_deck(deck, e, n)
+        random.shuffle(deck)
+        steps.append(deck)
+    return steps
+
+def linear_scan_audit(deck_coding, shuffle_steps, enc_keys, n):
+    # same matching strategy as the contract's check_shuffle
+    deck = list(deck_coding)
+    for step, e in zip(shuffle_steps, enc_keys):
+        deck = encrypt_deck(deck, e, n)
+        for card in deck:
+            if card not in step:
+                return False
+    return True
+
+def benchmark_shuffle_audit(deck_size, bits=256, players=3):
+    n = sra_setup(bits)
+    keys = [sra_generate_key(n-1)[0] for _ in range(players)]
+    deck_coding = list(range(2, 2 + deck_size))
+    steps = build_shuffle_steps(deck_coding, keys, n)
+
+    audit_time = measure(audit_shuffle, deck_coding, steps, keys, n, repetitions=1)
+    scan_time = measure(linear_scan_audit, deck_coding, steps, keys, n, repetitions=1)
+    print(f'{deck_size:>6} cards | indexed audit: {audit_time*1000:9.2f} ms ({audit_time/deck_size*1e6:6.2f} us/card) | linear scan: {scan_time*1000:9.2f} ms ({scan_time/deck_size*1e6:8.2f} us/card)')
+
+def builtin_chain(cards, exponents, n):
+    for exponent in exponents:
+        cards = [pow(card, exponent, n) for card in cards]
+    return cards
+
+def backend_chain(cards, exponents, n):
+    for exponent in exponents:
+        cards = decrypt_deck(cards, exponent, n)
+    return cards
+
+def montgomery_chain(cards, exponents, n):
+    context = MontgomeryContext(n)
+    cards = context.to_montgomery_deck(cards)
+    for exponent in exponents:
+        cards = context.pow_deck(cards, exponent)
+    return context.from_montgomery_deck(cards)
+
+def benchmark_montgomery_chain(bits, players=3):
+    n = sra_setup(bits)
+    exponents = [sra_generate_key(n-1)[1] for _ in range(players)]
+    deck = list(range(2, 2 + DECK_SIZE))
+
+    builtin_time = measure(builtin_chain, deck, exponents, n)
+    backend_time = measure(backend_chain, deck, exponents, n)
+    montgomery_time = measure(montgomery_chain, deck, exponents, n)
+    print(f'{bits:>5} bits | builtin pow: {builtin_time*1000:8.2f} ms | {BACKEND} decks: {backend_time*1000:8.2f} ms | Montgomery context: {montgomery_time*1000:8.2f} ms')
+
+def benchmark_vectorized_decks(tables, bits=256):
+    try:
+        import SRA_vectorized
+    except ImportError:
+        print(f'{tables:>5} decks | numpy not installed')
+        return
+
+    moduli = [sra_setup(bits) for _ in range(tables)]
+    exponents = [sra_generate_key(n-1)[0] for n in moduli]
+    decks = [list(range(2, 2 + DECK_SIZE)) for _ in range(tables)]
+
+    builtin_time = measure(lambda: [builtin_encrypt_deck(deck, e, n) for deck, e, n in zip(decks, exponents, moduli)], repetitions=1)
+    vectorized_time = measure(SRA_vectorized.pow_decks, decks, exponents, moduli, repetitions=1)
+    print(f'{tables:>5} decks | builtin pow: {builtin_time*1000:9.2f} ms | numpy lock-step: {vectorized_time*1000:9.2f} ms | speedup: {builtin_time/vectorized_time:5.2f}x')
+
+def benchmark_cipher(name, cipher):
+    key = cipher.generate_key()
+    deck = cipher.generate_deck_coding(DECK_SIZE)
+    encrypted_deck = key.encrypt_many(deck)
+
+    encrypt_time = measure(key.encrypt_many, deck, repetitions=1)
+    decrypt_time = measure(key.decrypt_many, encrypted_deck, repetitions=1)
+    print(f'{name:<32} | encrypt deck: {encrypt_time*1000:9.2f} ms | decrypt deck: {decrypt_time*1000:9.2f} ms')
+
+def benchmark_permutation(deck_size):
+    deck = list(range(deck_size))
+    records = bytearray(32 * deck_size)
+    repetitions = max(1, 10000 // deck_size)
+
+    mersenne_time = measure(random.shuffle, deck, repetitions=repetitions)
+    system_time = measure(random.SystemRandom().shuffle, deck, repetitions=repetitions)
+    secure_time = measure(secure_shuffle, deck, repetitions=repetitions)
+    records_time = measure(secure_shuffle, records, 32, repetitions=repetitions)
+    print(f'{deck_size:>8} cards | random.shuffle: {mersenne_time*1000:9.3f} ms | SystemRandom.shuffle: {system_time*1000:9.3f} ms | secure_shuffle: {secure_time*1000:9.3f} ms | on 32-byte records: {records_time*1000:9.3f} ms')
+
+if __name__ == '__main__':
+    print(f'Deck encryption ({DECK_SIZE} cards), backend = {BACKEND}')
+    for bits in (256, 1024, 2048):
+        benchmark_deck_backend(bits)
+
+    print(f'\nParallel deck encryption ({DECK_SIZE} cards, {os.cpu_count()} cpus)')
+    for bits in (256, 1024, 2048):
+        benchmark_parallel_decks(bits)
+
+    print('\nPrime generation (mean time)')
+    for bits in (256, 512, 1024, 2048, 3072):
+        benchmark_prime_generation(bits)
+
+    print('\nShuffle chain verification (3 players)')
+    for bits in (256, 1024, 2048):
+        benchmark_chain_verification(bits)
+
+    print('\nShuffle audit (3 players, 256 bits)')
+    for deck_size in (52, 208, 832, 3328):
+        benchmark_shuffle_audit(deck_size)
+
+    print(f'\nChained deck decryption ({DECK_SIZE} cards, 3 players)')
+    for bits in (256, 1024, 2048):
+        benchmark_montgomery_chain(bits)
+
+    print(f'\nVectorized multi-table encryption ({DECK_SIZE} cards per deck, 256 bits)')
+    for tables in (1, 10, 100):
+        benchmark_vectorized_decks(tables)
+
+    print(f'\nCommutative ciphers ({DECK_SIZE} cards)')
+    benchmark_cipher('SRA 256 bits (current N_BITS)', SRACipher.setup(256))
+    benchmark_cipher('SRA 2048 bits (112-bit security)', SRACipher.setup(2048))
+    benchmark_cipher('SRA 3072 bits (128-bit security)', SRACipher.setup(3072))
+    benchmark_cipher('EC secp256k1 (128-bit security)', ECCipher())
+
+    print('\nDeck permutation')
+    for deck_size in (52, 10000, 1000000):
+        benchmark_permutation(deck_size)
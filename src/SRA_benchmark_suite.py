@@ -0,0 +1,144 @@
+from SRA import *
+from Cipher import SRACipher
+import argparse
+import datetime
+import json
+import os
+import platform
+import statistics
+import sys
+import time
+
+BIT_SIZES = (256, 512, 1024, 2048, 3072)
+DECK_SIZE = 52
+REPETITIONS = 20
+# prime searches take seconds at the larger sizes and have a random duration
+SETUP_REPETITIONS = 5
+# a result slower than the baseline by more than this fraction is a regression
+TOLERANCE = 0.10
+
+def time_runs(function, *args, repetitions=REPETITIONS):
+    # returns the time (in seconds) of every run
+    runs = []
+    for _ in range(repetitions):
+        start = time.perf_counter()
+        function(*args)
+        runs.append(time.perf_counter() - start)
+    return runs
+
+def summarize(runs):
+    return {'median': statistics.median(runs),
+            'min': min(runs),
+            'max': max(runs),
+            'repetitions': len(runs)}
+
+def machine_metadata():
+    metadata = {'timestamp': datetime.datetime.now(datetime.timezone.utc).isoformat(timespec='seconds'),
+                'python': platform.python_version(),
+                'implementation': platform.python_implementation(),
+                'platform': platform.platform(),
+                'machine': platform.machine(),
+                'processor': platform.processor(),
+                'cpu_count': os.cpu_count(),
+                'backend': BACKEND,
+                'deck_size': DECK_SIZE}
+    if BACKEND == 'gmpy2':
+        import gmpy2
+        metadata['gmpy2'] = gmpy2.version()
+    return metadata
+
+def benchmark_bits(bits, repetitions=REPETITIONS, setup_repetitions=SETUP_REPETITIONS):
+    results = {}
+    results['sra_setup'] = summarize(time_runs(sra_setup, bits, repetitions=setup_repetitions))
+
+    cipher = SRACipher.setup(bits)
+    n = cipher.n
+    results['sra_generate_key'] = summarize(time_runs(sra_generate_key, n-1, repetitions=repetitions))
+
+    e, d = sra_generate_key(n-1)
+    deck = cipher.generate_deck_coding(DECK_SIZE)
+    encrypted_deck = encrypt_deck(deck, e, n)
+
+    results['sra_encrypt'] = summarize(time_runs(sra_encrypt, deck[0], e, n, repetitions=repetitions))
+    results['sra_decrypt'] = summarize(time_runs(sra_decrypt, encrypted_deck[0], d, n, repetitions=repetitions))
+    results['encrypt_deck'] = summarize(time_runs(encrypt_deck, deck, e, n, repetitions=repetitions))
+    results['decrypt_deck'] = summarize(time_runs(decrypt_deck, encrypted_deck, d, n, repetitions=repetitions))
+    results['is_quadratic_residue'] = summarize(time_runs(is_quadratic_residue, encrypted_deck[0], n, repetitions=repetitions))
+    results['generate_deck_coding'] = summarize(time_runs(cipher.generate_deck_coding, DECK_SIZE, repetitions=repetitions))
+    return results
+
+def run_suite(bit_sizes=BIT_SIZES, repetitions=REPETITIONS, setup_repetitions=SETUP_REPETITIONS):
+    report = {'metadata': machine_metadata(), 'results': {}}
+    for bits in bit_sizes:
+        results = benchmark_bits(bits, repetitions, setup_repetitions)
+        # JSON keys are strings anyway
+        report['results'][str(bits)] = results
+        print_results(bits, results)
+    return report
+
+def print_results(bits, results):
+    for operation, summary in results.items():
+        print(f'{bits:>5} bits | {operation:<22} | median: {summary["median"]*1000:10.3f} ms | min: {summary["min"]*1000:10.3f} ms | runs: {summary["repetitions"]}')
+
+def compare(baseline, current, tolerance=TOLERANCE):
+    # returns the list of (bits, operation, baseline median, current median) slower than the tolerance allows
+    # operations missing from either report are skipped
+    regressions = []
+    for bits, results in current['results'].items():
+        for operation, summary in results.items():
+            reference = baseline['results'].get(bits, {}).get(operation)
+            if reference is None:
+                continue
+            ratio = summary['median'] / reference['median']
+            flag = 'REGRESSION' if ratio > 1 + tolerance else ''
+            print(f'{bits:>5} bits | {operation:<22} | baseline: {reference["median"]*1000:10.3f} ms | current: {summary["median"]*1000:10.3f} ms | {ratio:5.2f}x {flag}')
+            if flag:
+                regressions.append((int(bits), operation, reference['median'], summary['median']))
+
+    for key in ('backend', 'platform', 'python'):
+        if baseline['metadata'].get(key) != current['metadata'].get(key):
+            print(f'Warning: different {key} ({baseline["metadata"].get(key)} -> {current["metadata"].get(key)}), the comparison may not be meaningful.')
+    return regressions
+
+def load_report(file_path):
+    try:
+        with open(file_path) as file:
+            return json.load(file)
+    except FileNotFoundError:
+        exit('Benchmark file "' + file_path + '" not found.')
+    except ValueError:
+        exit('Benchmark file "' + file_path + '" is not valid JSON.')
+
+def parse_arguments(arguments):
+    parser = argparse.ArgumentParser(description='SRA performance benchmark suite.')
+    parser.add_argument('--bits', type=int, nargs='+', default=list(BIT_SIZES), help='modulus sizes to measure')
+    parser.add_argument('--repetitions', type=int, default=REPETITIONS, help='runs of every operation')
+    parser.add_argument('--setup-repetitions', type=int, default=SETUP_REPETITIONS, help='runs of sra_setup')
+    parser.add_argument('--output', help='file the JSON report is written to')
+    parser.add_argument('--compare', metavar='BASELINE', help='JSON report to compare the results with')
+    parser.add_argument('--current', help='compare this JSON report instead of running the suite')
+    parser.add_argument('--tolerance', type=float, default=TOLERANCE, help='accepted slowdown as a fraction of the baseline')
+    return parser.parse_args(arguments)
+
+def main(arguments):
+    options = parse_arguments(arguments)
+
+    if options.current is not None:
+        report = load_report(options.current)
+    else:
+        report = run_suite(options.bits, options.repetitions, options.setup_repetitions)
+
+    if options.output is not None:
+        with open(options.output, 'w') as file:
+            json.dump(report, file, indent=2)
+
+    if options.compare is not None:
+        print(f'\nComparison with {options.compare} (tolerance {options.tolerance:.0%})')
+        regressions = compare(load_report(options.compare), report, options.tolerance)
+        if len(regressions) > 0:
+            print(f'{len(regressions)} regression(s) found.')
+            return 1
+    return 0
+
+if __name__ == '__main__':
+    sys.exit(main(sys.argv[1:]))
@@ -1,4 +1,8 @@
 from SRA import *
+from QR import *
+from Shuffle_auditor import *
+from Permutation import *
+import time
 
 n = sra_setup(256)
 
@@ -13,6 +17,15 @@ for i in range(2, n):
         deck.append(i)
         count += 1
 
+# the Jacobi symbol engine has to produce the same coding and accept it
+print('QR engine coding matches:', quadratic_residues(n, deck_size) == deck)
+print('QR engine validation:', validate_coding(n, deck) is None)
+
+# with a composite modulus codes of Jacobi symbol 1 can still be non-residues
+composite = sra_generate_prime(128) * sra_generate_prime(128)
+fake_residues = [code for code in range(2, 1000) if jacobi_symbol(code, composite) == 1 and is_quadratic_residue(code, composite) != 1]
+print('QR engine composite modulus:', validate_coding(composite, fake_residues) == 0)
+
 A_e, A_d = sra_generate_key(n-1)
 #print(A_e, A_d)
 
@@ -45,4 +58,113 @@ print(B_dec)
 # A draws the 2nd card
 B_dec = sra_decrypt(B_enc[1], B_d, n)
 A_dec = sra_decrypt(B_dec, A_d, n)
-print(A_dec)
\ No newline at end of file
+print(A_dec)
+
+# key generation time per hand, before (prime exponent) and after (random coprime exponent)
+def prime_exponent_key(phi):
+    e = sra_generate_prime(phi.bit_length() - 1)
+    return (e, pow(e, -1, phi))
+
+hands = 20
+for generate_key in (prime_exponent_key, sra_generate_key):
+    start = time.perf_counter()
+    for _ in range(hands):
+        e, d = generate_key(n-1)
+    print(f'{generate_key.__name__}: {(time.perf_counter() - start) / hands * 1000:.3f} ms per hand')
+
+# derived keys have to be reproducible and valid
+master_secret = b'\x01' * 32
+e, d = sra_derive_key(master_secret, '0x0', 1, n-1)
+print('derived key is reproducible:', (e, d) == sra_derive_key(master_secret, '0x0', 1, n-1))
+print('derived key is valid:', sra_decrypt(sra_encrypt(deck[0], e, n), d, n) == deck[0])
+
+# the composed exponent check has to accept the chain built above and localize a forged step
+print('chain verified:', verify_chain(deck, B_enc, [A_e, B_e], n) is None)
+forged = A_enc[:]
+forged[5] = sra_encrypt(deck[6], A_e, n)
+print('forged step localized:', verify_chain(deck, encrypt_deck(forged, B_e, n), [A_e, B_e], n, steps=[forged, encrypt_deck(forged, B_e, n)]) == (0, 5))
+
+# the batch verifier has to accept a correct step and reject a tampered one
+print('batch verification of a correct step:', batch_verify(deck, A_enc, A_e, n))
+tampered = A_enc[:]
+tampered[0] = tampered[0] * deck[0] % n
+print('batch verification of a tampered step:', batch_verify(deck, tampered, A_e, n))
+
+# negating two outputs has to be caught too, with a modulus for which -1 is not a square
+sign_n = n
+while sign_n % 4 != 3:
+    sign_n = sra_generate_prime(256)
+sign_e, _ = sra_generate_key(sign_n - 1)
+negated = encrypt_deck(deck, sign_e, sign_n)
+negated[0] = sign_n - negated[0]
+negated[1] = sign_n - negated[1]
+print('batch verification of two negated outputs:', not any(batch_verify(deck, negated, sign_e, sign_n) for _ in range(200)))
+
+# the auditor has to recover the permutation of a shuffled step
+B_permutation = [3, 0, 2, 1] + list(range(4, deck_size))
+B_shuffle = shuffle(B_enc, B_permutation)
+permutations, error = audit_shuffle(deck, [A_enc, B_shuffle], [A_e, B_e], n)
+print('shuffle audit:', error is None and all(B_shuffle[permutations[1][i]] == B_enc[i] for i in range(deck_size)))
+
+# both commutative ciphers have to remove layers in any order
+from Cipher import *
+for cipher in (SRACipher(n), ECCipher()):
+    coding = cipher.generate_deck_coding(4)
+    key1, key2 = cipher.generate_key(), cipher.generate_key()
+    layered = key2.encrypt_many(key1.encrypt_many(coding))
+    print(type(cipher).__name__, 'commutes:', key2.decrypt_many(key1.decrypt_many(layered)) == coding)
+
+# SRAKey has to match the plain functions
+A_key = SRAKey(n, A_e, A_d)
+print('SRAKey matches sra_encrypt:', A_key.encrypt_many(deck) == A_enc and A_key.decrypt(A_enc[0]) == deck[0])
+
+# a deck kept in Montgomery form through several layers has to come back as builtin pow computes it
+context = MontgomeryContext(n)
+chained = context.from_montgomery_deck(context.pow_deck(context.pow_deck(context.to_montgomery_deck(deck), A_e), B_e))
+print('Montgomery deck pow:', chained == [pow(pow(card, A_e, n), B_e, n) for card in deck] and all(type(card) is int for card in chained) and
+      context.from_montgomery_deck(context.pow_deck(context.to_montgomery_deck(deck[:2]), 0)) == [1, 1])
+
+# the vectorized engine has to agree with builtin pow for several decks at once, whatever their moduli and exponents
+try:
+    import SRA_vectorized
+except ImportError:
+    SRA_vectorized = None
+if SRA_vectorized is not None:
+    moduli = [n, sra_generate_prime(256), sra_generate_prime(200), sra_generate_prime(1024)]
+    exponents = [A_e, sra_generate_key(moduli[1] - 1)[0], 0, sra_generate_key(moduli[3] - 1)[0]]
+    decks = [deck, A_enc, [secrets.randbelow(moduli[2]) for _ in range(deck_size)], [secrets.randbelow(moduli[3]) for _ in range(deck_size)]]
+    vectorized = SRA_vectorized.pow_decks(decks, exponents, moduli)
+    print('vectorized decks:', vectorized == [[pow(card, e, mod) for card in cards] for cards, e, mod in zip(decks, exponents, moduli)] and
+          SRA_vectorized.pow_decks([[secrets.randbelow(moduli[3]) for _ in range(4)]], [0], [moduli[3]]) == [[1, 1, 1, 1]] and
+          SRA_vectorized.decrypt_deck(SRA_vectorized.encrypt_deck(deck, A_e, n), A_d, n) == deck)
+else:
+    print('vectorized decks: skipped, NumPy is not installed')
+
+# shuffling with the CSPRNG engine has to agree with SRA.shuffle
+shuffled = A_enc[:]
+permutation, inverse = secure_shuffle(shuffled)
+print('secure shuffle permutation:', shuffled == shuffle(A_enc, permutation) and shuffle(shuffled, inverse) == A_enc)
+
+# a DeckBuffer has to behave like the list of its cards
+from Deck_buffer import *
+buffer = A_key.encrypt_many(DeckBuffer.from_ints(deck))
+permutation, inverse = buffer.shuffle()
+print('deck buffer:', buffer == shuffle(A_enc, permutation) and A_key.decrypt_many(buffer[:2]) == [deck[i] for i in permutation[:2]])
+
+# out of range writes and comparisons with non-decks have to fail like they do for a list
+try:
+    buffer[deck_size] = 1
+    print('deck buffer bounds: False')
+except IndexError:
+    print('deck buffer bounds:', (buffer == None) is False and buffer != 5)
+
+# the digest has to be the keccak256 the contract computes on the ABI encoded uint256[52]
+from eth_abi import encode
+from eth_utils import keccak
+print('deck buffer digest:', buffer.digest() == keccak(encode(['uint256[52]'], [buffer.to_ints()])) and
+      buffer.abi_encode() == encode(['uint256[52]'], [buffer.to_ints()]))
+
+# the card codec has to give back the shared card objects and reject codes outside the coding
+from Card import *
+codec = CardCodec(deck)
+print('card codec:', codec.decode_hand(deck[:5]) == list(DECK[:5]) and codec.decode(deck[0]) is DECK[0] and codec.decode_hand([A_enc[0]]) is None)
@@ -0,0 +1,120 @@
+import numpy as np
+
+# decks are stored as (cards, limbs) arrays of 24-bit limbs inside uint64 words,
+# so that partial products (< 2^48) can be accumulated without propagating carries at every step
+LIMB_BITS = 24
+LIMB_BYTES = LIMB_BITS // 8
+LIMB_MASK = (1 << LIMB_BITS) - 1
+# exponents are processed WINDOW_BITS bits at a time
+WINDOW_BITS = 4
+
+def limbs_for(bits: int):
+    return -(-bits // LIMB_BITS)
+
+def to_limbs(values, limbs: int):
+    raw = b''.join(value.to_bytes(limbs * LIMB_BYTES, 'little') for value in values)
+    digits = np.frombuffer(raw, dtype=np.uint8).reshape(len(values), limbs, LIMB_BYTES).astype(np.uint64)
+    return digits[:, :, 0] | (digits[:, :, 1] << 8) | (digits[:, :, 2] << 16)
+
+def from_limbs(array):
+    rows, limbs = array.shape
+    digits = np.empty((rows, limbs, LIMB_BYTES), dtype=np.uint8)
+    for byte in range(LIMB_BYTES):
+        digits[:, :, byte] = (array >> (8 * byte)) & 0xFF
+    raw = digits.tobytes()
+    size = limbs * LIMB_BYTES
+    return [int.from_bytes(raw[row*size : (row+1)*size], 'little') for row in range(rows)]
+
+def _normalize(t):
+    # propagates the carries so that every limb is below 2^LIMB_BITS
+    for j in range(t.shape[1] - 1):
+        t[:, j+1] += t[:, j] >> LIMB_BITS
+        t[:, j] &= LIMB_MASK
+    return t
+
+def _subtract_if_greater(t, n):
+    # t has one limb more than n and holds a value below 2n, the result is t mod n
+    rows, limbs = n.shape
+    difference = np.empty((rows, limbs), dtype=np.int64)
+    borrow = np.zeros(rows, dtype=np.int64)
+    for j in range(limbs):
+        value = t[:, j].astype(np.int64) - n[:, j].astype(np.int64) - borrow
+        borrow = (value < 0).astype(np.int64)
+        difference[:, j] = value + (borrow << LIMB_BITS)
+    greater = (t[:, limbs].astype(np.int64) - borrow) >= 0
+    return np.where(greater[:, None], difference.astype(np.uint64), t[:, :limbs])
+
+def montgomery_multiply(a, b, n, n_prime):
+    # returns a * b * R^-1 mod n (R = 2^(LIMB_BITS*limbs)) row by row,
+    # every row may use its own modulus
+    rows, limbs = n.shape
+    t = np.zeros((rows, 2*limbs + 1), dtype=np.uint64)
+
+    # schoolbook product, one limb of b at a time for every card in lock-step
+    for i in range(limbs):
+        t[:, i : i+limbs] += a * b[:, i : i+1]
+
+    # Montgomery reduction, clearing the lowest limb at every step
+    for i in range(limbs):
+        t[:, i+1] += t[:, i] >> LIMB_BITS
+        t[:, i] &= LIMB_MASK
+        m = (t[:, i] * n_prime) & LIMB_MASK
+        t[:, i : i+limbs] += m[:, None] * n
+        t[:, i+1] += t[:, i] >> LIMB_BITS
+
+    return _subtract_if_greater(_normalize(t[:, limbs:].copy()), n)
+
+def pow_decks(decks, exponents, moduli):
+    # raises every card of decks[k] to exponents[k] modulo moduli[k], all decks in a single pass
+    # returns the decks as lists of ints
+    limbs = limbs_for(max(n.bit_length() for n in moduli))
+    shift = LIMB_BITS * limbs
+    r_mask = (1 << LIMB_BITS) - 1
+
+    cards, row_moduli, row_exponents = [], [], []
+    for deck, exponent, n in zip(decks, exponents, moduli):
+        # conversion to Montgomery form happens once, at the boundary
+        cards += [(card << shift) % n for card in deck]
+        row_moduli += [n] * len(deck)
+        row_exponents += [exponent] * len(deck)
+    if len(cards) == 0:
+        return [[] for _ in decks]
+
+    n = to_limbs(row_moduli, limbs)
+    n_prime = np.array([-pow(modulus, -1, 1 << LIMB_BITS) & r_mask for modulus in row_moduli], dtype=np.uint64)
+    base = to_limbs(cards, limbs)
+    result = to_limbs([(1 << shift) % modulus for modulus in row_moduli], limbs)
+
+    # fixed-window exponentiation: every row picks its own table entry,
+    # so decks with different exponents still move in lock-step
+    table = [result, base]
+    for _ in range(2, 1 << WINDOW_BITS):
+        table.append(montgomery_multiply(table[-1], base, n, n_prime))
+    table = np.stack(table)
+    row_indices = np.arange(len(cards))
+
+    exponent_bits = max(exponent.bit_length() for exponent in row_exponents)
+    windows = -(-exponent_bits // WINDOW_BITS)
+    window_mask = (1 << WINDOW_BITS) - 1
+    for window in reversed(range(windows)):
+        for _ in range(WINDOW_BITS):
+            result = montgomery_multiply(result, result, n, n_prime)
+        digits = np.array([exponent >> (window * WINDOW_BITS) & window_mask for exponent in row_exponents])
+        if digits.any():
+            result = montgomery_multiply(result, table[digits, row_indices], n, n_prime)
+
+    # leaving Montgomery form
+    values = from_limbs(result)
+    output = []
+    start = 0
+    for deck, modulus in zip(decks, moduli):
+        r_inverse = pow(1 << shift, -1, modulus)
+        output.append([value * r_inverse % modulus for value in values[start : start + len(deck)]])
+        start += len(deck)
+    return output
+
+def encrypt_deck(cards, e: int, n: int):
+    return pow_decks([cards], [e], [n])[0]
+
+def decrypt_deck(cards, d: int, n: int):
+    return pow_decks([cards], [d], [n])[0]
@@ -0,0 +1,39 @@
+from SRA import encrypt_deck
+
+def recover_permutation(previous_deck, step, e: int, n: int):
+    # returns permutation such that step[permutation[i]] == previous_deck[i]^e mod n,
+    # or the index of the first card of previous_deck that cannot be found in step
+    # a dict indexing the step replaces the contract's linear scan, so the check is linear in the deck size
+    index = {card: position for position, card in enumerate(step)}
+
+    permutation = []
+    used = set()
+    for card_index, card in enumerate(encrypt_deck(previous_deck, e, n)):
+        position = index.get(card)
+        # a position matched twice means the step duplicated a card,
+        # which the contract's membership check alone would not notice
+        if position is None or position in used:
+            return (None, card_index)
+        permutation.append(position)
+        used.add(position)
+
+    return (permutation, None)
+
+def audit_shuffle(deck_coding, shuffle_steps, enc_keys, n: int):
+    # replays the contract's check_shuffle on decks of any size
+    # returns (permutations, None) with the permutation applied by every player
+    # or (permutations found so far, (player_index, card_index)) at the first invalid card
+    permutations = []
+    previous_deck = deck_coding
+    for player_index, (step, e) in enumerate(zip(shuffle_steps, enc_keys)):
+        if len(step) != len(previous_deck):
+            return (permutations, (player_index, None))
+
+        permutation, card_index = recover_permutation(previous_deck, step, e, n)
+        if permutation is None:
+            return (permutations, (player_index, card_index))
+
+        permutations.append(permutation)
+        previous_deck = step
+
+    return (permutations, None)